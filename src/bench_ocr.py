@@ -0,0 +1,95 @@
+"""
+Confronto dei motori OCR disponibili sulla CPU.
+
+Uso:
+    python -m src.bench_ocr etichetta1.png etichetta2.jpg --lang ita --repeat 5
+
+Per ogni motore misura il caricamento (prima chiamata), il tempo medio per
+immagine in modalita' singola e in batch, e stampa il testo riconosciuto
+per un confronto a vista dell'accuratezza.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+if __package__ is None or __package__ == "":
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from PIL import Image, ImageOps
+
+from src import ocr_engines
+
+
+def _load(paths: list[str]) -> list[Image.Image]:
+    images = []
+    for p in paths:
+        with Image.open(p) as img:
+            images.append(ImageOps.exif_transpose(img.convert("RGB")))
+    return images
+
+
+def bench_engine(name: str, images: list[Image.Image], lang: str, repeat: int) -> dict:
+    start = time.perf_counter()
+    engine = ocr_engines.ENGINE_CLASSES[name]()
+    texts = engine.recognize_batch(images[:1], lang)
+    load_s = time.perf_counter() - start
+
+    single: list[float] = []
+    batch: list[float] = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        texts = [engine.recognize(img, lang) for img in images]
+        single.append((time.perf_counter() - t0) / len(images))
+        t0 = time.perf_counter()
+        engine.recognize_batch(images, lang)
+        batch.append((time.perf_counter() - t0) / len(images))
+    return {
+        "name": name,
+        "load_ms": load_s * 1000,
+        "single_ms": statistics.median(single) * 1000,
+        "batch_ms": statistics.median(batch) * 1000,
+        "texts": texts,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--lang", default="ita")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--engine", action="append", choices=sorted(ocr_engines.ENGINE_CLASSES))
+    args = parser.parse_args(argv)
+
+    # importa ocr_service solo per configurare il Tesseract incluso nel bundle
+    from src import ocr_service  # noqa: F401
+
+    names = args.engine or ocr_engines.available_engines()
+    if not names:
+        print("Nessun motore OCR disponibile.")
+        return 1
+    images = _load(args.images)
+
+    results = []
+    for name in names:
+        try:
+            results.append(bench_engine(name, images, args.lang, max(1, args.repeat)))
+        except Exception as exc:
+            print(f"{name}: errore {exc}")
+
+    print(f"{'motore':<14}{'carico ms':>12}{'singola ms/img':>16}{'batch ms/img':>14}")
+    for r in results:
+        print(f"{r['name']:<14}{r['load_ms']:>12.1f}{r['single_ms']:>16.1f}{r['batch_ms']:>14.1f}")
+    for r in results:
+        print(f"\n== {r['name']} ==")
+        for path, text in zip(args.images, r["texts"]):
+            print(f"{path}: {text!r}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Profili webcam: formato e risoluzione separati per anteprima e scatto.
+
+L'anteprima gira a bassa risoluzione (leggera per il ciclo da 40 ms); quando
+si preme "Scatta" la camera viene portata alla risoluzione di acquisizione
+solo per il tempo necessario a leggere un fotogramma.
+I driver non sempre accettano i valori richiesti: `CameraMode` riporta
+quelli effettivamente negoziati, riletti con `cap.get(CAP_PROP_*)`.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+
+from PIL import Image
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None  # type: ignore[assignment]
+
+from .config import CAMERA_PROFILES, CAMERA_STILL_WARMUP_FRAMES
+
+
+@dataclass(frozen=True)
+class CameraProfile:
+    name: str
+    fourcc: tuple[str, ...]  # formati in ordine di preferenza, es. ("MJPG", "YUYV")
+    preview_size: tuple[int, int]
+    capture_size: tuple[int, int]
+
+
+@dataclass(frozen=True)
+class CameraMode:
+    width: int
+    height: int
+    fourcc: str
+    fps: float
+
+    def __str__(self) -> str:
+        fps = f" @ {self.fps:.0f} fps" if self.fps > 0 else ""
+        return f"{self.width}x{self.height} {self.fourcc or '?'}{fps}"
+
+
+def load_profiles() -> list[CameraProfile]:
+    return [
+        CameraProfile(name, tuple(p["fourcc"]), tuple(p["preview"]), tuple(p["capture"]))
+        for name, p in CAMERA_PROFILES.items()
+    ]
+
+
+def _decode_fourcc(value: float) -> str:
+    code = int(value)
+    chars = "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4))
+    return chars if chars.isprintable() and chars.strip() else ""
+
+
+def current_mode(cap) -> CameraMode:
+    return CameraMode(
+        width=int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        height=int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        fourcc=_decode_fourcc(cap.get(cv2.CAP_PROP_FOURCC)),
+        fps=float(cap.get(cv2.CAP_PROP_FPS) or 0.0),
+    )
+
+
+def negotiate(cap, fourccs: tuple[str, ...], size: tuple[int, int]) -> CameraMode:
+    """
+    Imposta formato e risoluzione. Il FOURCC va impostato prima delle
+    dimensioni (con DirectShow l'ordine inverso viene ignorato); si prova
+    ogni formato finche' il driver non lo conferma.
+    """
+    for fourcc in fourccs:
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, size[0])
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, size[1])
+        mode = current_mode(cap)
+        if mode.fourcc == fourcc:
+            return mode
+    return current_mode(cap)
+
+
+def read_frame(cap) -> tuple[Image.Image | None, float]:
+    """Legge un fotogramma RGB; restituisce anche il tempo di lettura in secondi."""
+    start = time.perf_counter()
+    ok, frame = cap.read()
+    elapsed = time.perf_counter() - start
+    if not ok or frame is None:
+        return None, elapsed
+    return Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)), elapsed
+
+
+def grab_still(cap, profile: CameraProfile, restore_preview: bool = False) -> tuple[Image.Image | None, CameraMode]:
+    """
+    Porta la camera alla risoluzione di acquisizione e legge un fotogramma.
+    I primi fotogrammi dopo il cambio di modo sono spesso neri o della
+    risoluzione precedente e vengono scartati. Se nessun fotogramma ha la
+    dimensione del modo negoziato restituisce None, cosi' il chiamante usa
+    (e dichiara) il fotogramma di anteprima.
+    """
+    mode = negotiate(cap, profile.fourcc, profile.capture_size)
+    image = None
+    for _ in range(max(0, CAMERA_STILL_WARMUP_FRAMES)):
+        cap.grab()
+    for _ in range(3):
+        frame, _elapsed = read_frame(cap)
+        if frame is not None and frame.size == (mode.width, mode.height):
+            image = frame
+            break
+    if restore_preview:
+        negotiate(cap, profile.fourcc, profile.preview_size)
+    return image, mode
+
+
+class FrameTimer:
+    """Media mobile esponenziale della latenza di lettura e del periodo tra fotogrammi."""
+
+    def __init__(self, alpha: float = 0.1):
+        self.alpha = alpha
+        self.read_ms = 0.0
+        self.period_ms = 0.0
+        self._last: float | None = None
+
+    def update(self, read_s: float) -> None:
+        now = time.perf_counter()
+        self.read_ms = self._ema(self.read_ms, read_s * 1000)
+        if self._last is not None:
+            self.period_ms = self._ema(self.period_ms, (now - self._last) * 1000)
+        self._last = now
+
+    def _ema(self, current: float, value: float) -> float:
+        return value if current == 0.0 else current + self.alpha * (value - current)
+
+    @property
+    def fps(self) -> float:
+        return 1000.0 / self.period_ms if self.period_ms > 0 else 0.0
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from io import BytesIO
 
 from PIL import Image, ImageOps
@@ -7,6 +8,7 @@ import barcode
 from barcode.writer import ImageWriter
 import qrcode
 
+from .config import QR_CACHE_MAX_PIXELS, QR_CACHE_SIZE
 from .utils import get_font_path
 
 def generate_qrcode(text: str, width: int, height: int) -> Image.Image:
@@ -23,3 +25,16 @@ def generate_qrcode(text: str, width: int, height: int) -> Image.Image:
     img = img.convert("RGB")
     img = ImageOps.contain(img, (width, height))
     return img
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def _generate_qrcode_cached(text: str, width: int, height: int) -> Image.Image:
+    return generate_qrcode(text, width, height)
+
+
+def generate_qrcode_cached(text: str, width: int, height: int) -> Image.Image:
+    # Solo i QR piccoli passano dalla cache condivisa, cosi' la memoria resta limitata;
+    # l'immagine restituita non va modificata
+    if width * height > QR_CACHE_MAX_PIXELS:
+        return generate_qrcode(text, width, height)
+    return _generate_qrcode_cached(text, width, height)
@@ -1,3 +1,5 @@
+from pathlib import Path
+
 APP_TITLE = "OCR → QR Generator"
 
 SUPPORTED_IMAGES = (
@@ -9,3 +11,57 @@ SUPPORTED_IMAGES = (
     ".tiff",
     ".webp",
 )
+
+# Esportazione immagini (vedi export_service)
+EXPORT_PNG_COMPRESS_LEVEL = 3  # 0-9: 1-3 e' molto piu' veloce di 6 con file di poco piu' grandi
+EXPORT_JPEG_QUALITY = 90
+EXPORT_CLOSE_TIMEOUT_S = 15.0
+
+# Motore OCR: "auto", "onnx", "libtesseract" o "tesseract" (vedi ocr_engines)
+# "auto" usa il primo disponibile in quest'ordine.
+OCR_ENGINE = "auto"
+# Modello ONNX di riconoscimento riga (CRNN / PP-OCR rec), relativo alla cartella del bundle
+ONNX_REC_MODEL = "models/rec.onnx"
+ONNX_REC_CHARSET = "models/rec_charset.txt"
+ONNX_REC_USE_SPACE = True
+OCR_CLOSE_TIMEOUT_S = 5.0  # attesa massima degli OCR in corso quando si chiudono i motori
+
+# Storico etichette elaborate (vedi history_store)
+HISTORY_DB_PATH = Path.home() / ".imagetobarcode" / "history.sqlite3"
+HISTORY_MAX_DISTANCE = 12  # bit di differenza (su 256) del dHash per proporre una voce come gia' vista
+HISTORY_VERIFY_MAX_DIFF = 10.0  # differenza media (0-255) tra le miniature in grigi per confermare la voce
+# voci piu' recenti tenute nell'indice in memoria: la ricerca le scorre tutte
+# (~0.5 ms a 100k voci), le piu' vecchie restano solo nel database
+HISTORY_INDEX_LIMIT = 100_000
+HISTORY_THUMBNAIL_SIZE = 128
+
+# Profili webcam (vedi camera_profile): anteprima leggera, scatto ad alta risoluzione.
+# I driver scelgono il modo supportato piu' vicino; il primo profilo e' quello predefinito.
+CAMERA_PROFILES = {
+    "Standard (MJPG)": {"fourcc": ("MJPG", "YUYV"), "preview": (640, 480), "capture": (1920, 1080)},
+    "Alta risoluzione (MJPG)": {"fourcc": ("MJPG", "YUYV"), "preview": (640, 480), "capture": (3840, 2160)},
+    "Non compresso (YUYV)": {"fourcc": ("YUYV",), "preview": (640, 480), "capture": (1280, 720)},
+}
+CAMERA_STILL_WARMUP_FRAMES = 3
+CAMERA_STATUS_INTERVAL_S = 0.5
+
+# Cache dei QR piccoli (postazioni). Ogni voce e' al massimo QR_CACHE_MAX_PIXELS pixel RGB
+# (4 byte/pixel in Pillow): 64 x 256x256 x 4 = 16 MB nel caso peggiore.
+QR_CACHE_SIZE = 64
+QR_CACHE_MAX_PIXELS = 256 * 256
+
+# Modalita' multi-postazione (vedi stations)
+OCR_WORKERS = 2  # thread OCR condivisi da tutte le postazioni
+STATION_TILE_SIZE = (320, 240)
+STATION_QR_SIZE = (160, 160)
+STATION_STALL_S = 2.0  # senza fotogrammi da questo tempo la camera e' considerata bloccata
+STATION_RECONNECT_S = 2.0
+STATION_CAPTURE_TIMEOUT_S = 10.0
+STATION_COLUMNS = 3
+
+# Immagini della sessione (vedi image_store)
+IMAGE_STORE_RAM_MB = 256  # originali, copie di lavoro e miniature; oltre, gli originali vanno su disco
+IMAGE_STORE_WORKING_SIZE = 1280  # lato massimo della copia di lavoro sempre in RAM
+IMAGE_STORE_MAX_ENTRIES = 30
+IMAGE_STORE_THUMB_SIZE = 96
+RECENT_CAPTURES_SHOWN = 10
@@ -0,0 +1,220 @@
+"""
+Salvataggio immagini in background con scrittura atomica.
+
+Il thread Tk non tocca mai il disco: `ExportWriter.submit` mette in coda il
+lavoro, un thread dedicato codifica e scrive, e la UI raccoglie gli esiti con
+`poll_results` (niente chiamate Tk dal thread di scrittura).
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from PIL import Image
+
+from .config import EXPORT_JPEG_QUALITY, EXPORT_PNG_COMPRESS_LEVEL
+
+# mkstemp crea file 0600: prima del rename si applicano i permessi che avrebbe
+# un file creato normalmente (0666 meno la umask del processo)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+_FILE_MODE = 0o666 & ~_UMASK
+
+_FORMATS = {
+    ".png": "PNG",
+    ".jpg": "JPEG",
+    ".jpeg": "JPEG",
+    ".bmp": "BMP",
+    ".tif": "TIFF",
+    ".tiff": "TIFF",
+    ".webp": "WEBP",
+}
+
+
+@dataclass
+class ExportResult:
+    path: Path
+    error: Exception | None
+    elapsed_s: float
+    tag: object = None  # passato invariato da `submit`
+
+
+@dataclass
+class _ExportJob:
+    image: Image.Image
+    path: Path
+    tag: object = None
+
+
+def format_for_path(path: str | os.PathLike) -> str:
+    ext = Path(path).suffix.lower()
+    try:
+        return _FORMATS[ext]
+    except KeyError:
+        raise ValueError(f"Formato non supportato: {ext or '(nessuna estensione)'}") from None
+
+
+def _is_near_binary(gray: Image.Image) -> bool:
+    """
+    Un codice ridimensionato e' quasi tutto nero puro e bianco puro, con
+    grigi solo sui bordi dei moduli: i due livelli piu' frequenti devono
+    essere vicini agli estremi e coprire almeno meta' dei pixel.
+    """
+    hist = gray.histogram()
+    top = sorted(range(256), key=hist.__getitem__, reverse=True)[:2]
+    dark, light = min(top), max(top)
+    covered = hist[dark] + hist[light]
+    return dark <= 32 and light >= 223 and covered * 2 >= gray.width * gray.height
+
+
+def reduce_for_export(image: Image.Image, fmt: str) -> Image.Image:
+    """
+    Riduce la profondita' colore quando l'immagine lo consente.
+      - grigi quasi solo bianco/nero (QR ridimensionati) -> soglia a meta':
+        "1" per PNG/TIFF/BMP, "L" bianco/nero puro per gli altri formati
+      - altri grigi    -> "L"
+      - <= 256 colori  -> "P" (solo PNG)
+    Negli altri casi l'immagine resta invariata.
+    """
+    if image.mode == "1":
+        return image
+    if image.mode == "L":
+        gray = image
+    else:
+        rgb = image if image.mode == "RGB" else image.convert("RGB")
+        colors = rgb.getcolors(256)
+        if colors is None:
+            return rgb
+        if not all(r == g == b for _, (r, g, b) in colors):
+            if fmt == "PNG":
+                return rgb.quantize(colors=len(colors), dither=Image.Dither.NONE)
+            return rgb
+        gray = rgb.convert("L")
+    if not _is_near_binary(gray):
+        return gray
+    bw = gray.point(lambda v: 255 if v >= 128 else 0)
+    if fmt in ("PNG", "TIFF", "BMP"):
+        return bw.convert("1", dither=Image.Dither.NONE)
+    return bw
+
+
+def save_atomic(
+    image: Image.Image,
+    path: str | os.PathLike,
+    png_compress_level: int = EXPORT_PNG_COMPRESS_LEVEL,
+    jpeg_quality: int = EXPORT_JPEG_QUALITY,
+) -> Path:
+    """
+    Scrive su un file temporaneo nella stessa cartella e poi lo rinomina:
+    chi legge il percorso finale non vede mai un file scritto a meta'.
+    """
+    target = Path(path)
+    fmt = format_for_path(target)
+    img = reduce_for_export(image, fmt)
+    params: dict = {}
+    if fmt == "PNG":
+        params["compress_level"] = png_compress_level
+    elif fmt == "JPEG":
+        params["quality"] = jpeg_quality
+    elif fmt == "WEBP":
+        params["quality"] = jpeg_quality
+        params["method"] = 0  # encoder piu' veloce
+
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{target.name}.", suffix=".tmp", dir=str(target.parent))
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            img.save(fh, format=fmt, **params)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.chmod(tmp_name, _FILE_MODE)
+        os.replace(tmp_name, target)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    return target
+
+
+class ExportWriter:
+    """
+    Coda di salvataggi servita da un singolo thread in background.
+    I salvataggi avvengono nell'ordine di inserimento.
+    """
+
+    def __init__(
+        self,
+        png_compress_level: int = EXPORT_PNG_COMPRESS_LEVEL,
+        jpeg_quality: int = EXPORT_JPEG_QUALITY,
+    ):
+        self.png_compress_level = png_compress_level
+        self.jpeg_quality = jpeg_quality
+        self._jobs: queue.Queue[_ExportJob | None] = queue.Queue()
+        self._results: queue.Queue[ExportResult] = queue.Queue()
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._worker, name="export-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, image: Image.Image, path: str | os.PathLike, tag: object = None) -> None:
+        """`tag` torna nel relativo `ExportResult`: serve a legare l'esito al chiamante."""
+        # Valida subito l'estensione cosi' l'errore arriva al chiamante
+        format_for_path(path)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("ExportWriter chiuso")
+            self._pending += 1
+        # L'immagine non viene copiata: chi la passa non deve modificarla in place.
+        self._jobs.put(_ExportJob(image=image, path=Path(path), tag=tag))
+
+    def pending(self) -> int:
+        with self._cond:
+            return self._pending
+
+    def poll_results(self) -> list[ExportResult]:
+        results: list[ExportResult] = []
+        while True:
+            try:
+                results.append(self._results.get_nowait())
+            except queue.Empty:
+                return results
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Attende lo svuotamento della coda; False se scade il timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def close(self, timeout: float | None = None) -> bool:
+        with self._cond:
+            if self._closed:
+                return self._pending == 0
+            self._closed = True
+        done = self.flush(timeout)
+        self._jobs.put(None)
+        if done:
+            self._thread.join(timeout)
+        return done
+
+    def _worker(self) -> None:
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            start = time.perf_counter()
+            error: Exception | None = None
+            try:
+                save_atomic(job.image, job.path, self.png_compress_level, self.jpeg_quality)
+            except Exception as exc:
+                error = exc
+            self._results.put(ExportResult(job.path, error, time.perf_counter() - start, job.tag))
+            with self._cond:
+                self._pending -= 1
+                self._cond.notify_all()
@@ -0,0 +1,252 @@
+"""
+Storico delle etichette elaborate, indicizzato per hash percettivo.
+
+Ogni acquisizione viene ridotta a un dHash a 256 bit (griglia 16x16): due
+fotografie della stessa confezione differiscono di pochi bit. Una voce con
+distanza di Hamming <= `max_distance` e la stessa lingua e' solo una
+candidata: prima di riusarla `looks_same` confronta le miniature e la UI
+chiede conferma all'operatore, perche' due confezioni dello stesso prodotto
+possono differire solo per un seriale troppo piccolo per l'hash.
+
+La ricerca e' una scansione esatta vettorializzata con numpy sugli hash piu'
+recenti, tenuti in memoria come 4 array di parole a 64 bit (uno per parola,
+cosi' ogni XOR/popcount scorre memoria contigua). Il costo non dipende da
+quanto gli hash sono simili tra loro, a differenza degli indici a blocchi
+che degenerano quando molte etichette condividono gli stessi blocchi, ma
+cresce con il numero di voci: `HISTORY_INDEX_LIMIT` e' scelto perche' una
+ricerca resti sotto il millisecondo.
+"""
+
+from __future__ import annotations
+
+import io
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from PIL import Image, ImageChops, ImageStat
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore[assignment]
+
+from .config import (
+    HISTORY_DB_PATH,
+    HISTORY_INDEX_LIMIT,
+    HISTORY_MAX_DISTANCE,
+    HISTORY_THUMBNAIL_SIZE,
+    HISTORY_VERIFY_MAX_DIFF,
+)
+
+HASH_SIZE = 16
+HASH_BITS = HASH_SIZE * HASH_SIZE
+_WORDS = HASH_BITS // 64
+_WORD_MASK = (1 << 64) - 1
+_NO_MATCH = 0xFFFF  # distanza assegnata alle voci di un'altra lingua
+
+# Le voci salvate con il vecchio hash a 64 bit (INTEGER) vengono ignorate:
+# i nuovi hash sono BLOB da 32 byte nella stessa colonna.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS labels (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    phash BLOB NOT NULL,
+    ocr_text TEXT NOT NULL,
+    qr_payload TEXT,
+    lang TEXT,
+    created_at REAL NOT NULL,
+    thumbnail BLOB
+);
+CREATE INDEX IF NOT EXISTS labels_created_at ON labels (created_at);
+"""
+
+
+@dataclass
+class HistoryEntry:
+    id: int
+    phash: int
+    ocr_text: str
+    qr_payload: str | None
+    lang: str | None
+    created_at: float
+    distance: int = 0
+
+
+def dhash(image: Image.Image) -> int:
+    """dHash a 256 bit: confronta i pixel adiacenti di una miniatura 17x16 in grigi."""
+    # Ridurre prima di convertire evita la conversione a grigi dell'immagine intera
+    small = image.resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BOX).convert("L")
+    px = small.tobytes()
+    value = 0
+    for row in range(HASH_SIZE):
+        base = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (px[base + col] > px[base + col + 1])
+    return value
+
+
+def _hash_to_blob(value: int) -> bytes:
+    return value.to_bytes(HASH_BITS // 8, "big")
+
+
+def _make_thumbnail(image: Image.Image) -> Image.Image:
+    thumb = image
+    if max(image.size) > HISTORY_THUMBNAIL_SIZE:
+        thumb = image.resize(_thumb_size(image.size), Image.Resampling.BOX)
+    return thumb.convert("RGB")
+
+
+def _encode_thumbnail(thumb: Image.Image) -> bytes:
+    buf = io.BytesIO()
+    thumb.save(buf, format="JPEG", quality=75)
+    return buf.getvalue()
+
+
+def _thumb_size(size: tuple[int, int]) -> tuple[int, int]:
+    w, h = size
+    scale = HISTORY_THUMBNAIL_SIZE / max(w, h)
+    return max(1, round(w * scale)), max(1, round(h * scale))
+
+
+class HistoryStore:
+    def __init__(
+        self,
+        path: str | Path = HISTORY_DB_PATH,
+        max_distance: int = HISTORY_MAX_DISTANCE,
+        index_limit: int = HISTORY_INDEX_LIMIT,
+    ):
+        if np is None or not hasattr(np, "bitwise_count"):
+            raise ImportError("Lo storico etichette richiede numpy >= 2.0")
+        self.max_distance = max_distance
+        self.index_limit = index_limit
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        # indice in memoria: buffer circolare delle ultime `index_limit` voci
+        self._words = np.zeros((_WORDS, index_limit), dtype=np.uint64)
+        self._ids = np.full(index_limit, -1, dtype=np.int64)
+        self._langs = np.zeros(index_limit, dtype=np.int16)
+        self._lang_codes: dict[str | None, int] = {None: 0}
+        self._count = 0
+        self._load_index()
+
+    def _lang_code(self, lang: str | None) -> int:
+        code = self._lang_codes.get(lang)
+        if code is None:
+            code = len(self._lang_codes)
+            self._lang_codes[lang] = code
+        return code
+
+    def _load_index(self) -> None:
+        rows = self._db.execute(
+            "SELECT id, phash, lang FROM labels WHERE typeof(phash) = 'blob' AND length(phash) = ?"
+            " ORDER BY id DESC LIMIT ?",
+            (HASH_BITS // 8, self.index_limit),
+        ).fetchall()
+        rows.reverse()
+        self._index_rows(rows)
+
+    def _index_rows(self, rows: list[tuple[int, bytes, str | None]]) -> None:
+        """Carica l'indice vuoto in blocco (dalla voce meno recente), senza un ciclo per parola."""
+        rows = rows[-self.index_limit :]
+        n = len(rows)
+        if not n:
+            return
+        ids, blobs, langs = zip(*rows)
+        # i BLOB sono big-endian: la parola 0 contiene i bit piu' significativi
+        words = np.frombuffer(b"".join(blobs), dtype=">u8").reshape(n, _WORDS)
+        self._words[:, :n] = words.T
+        self._ids[:n] = ids
+        self._langs[:n] = [self._lang_code(lang) for lang in langs]
+        self._count = n
+
+    def _index(self, entry_id: int, phash: int, lang: str | None) -> None:
+        pos = self._count % self.index_limit
+        for k in range(_WORDS):
+            self._words[k, pos] = (phash >> (64 * (_WORDS - 1 - k))) & _WORD_MASK
+        self._ids[pos] = entry_id
+        self._langs[pos] = self._lang_code(lang)
+        self._count += 1
+
+    def _nearest(self, phash: int, lang: str | None) -> tuple[int, int] | None:
+        filled = min(self._count, self.index_limit)
+        code = self._lang_codes.get(lang)
+        if not filled or code is None:
+            return None
+        words = self._words[:, :filled]
+        dist = np.bitwise_count(words[0] ^ np.uint64(phash >> (64 * (_WORDS - 1)))).astype(np.uint16)
+        for k in range(1, _WORDS):
+            query = np.uint64((phash >> (64 * (_WORDS - 1 - k))) & _WORD_MASK)
+            dist += np.bitwise_count(words[k] ^ query)
+        dist[self._langs[:filled] != code] = _NO_MATCH
+        best = int(dist.min())
+        if best > self.max_distance:
+            return None
+        # a parita' di distanza vince la voce piu' recente
+        entry_id = int(self._ids[:filled][dist == best].max())
+        return best, entry_id
+
+    def find_similar(self, phash: int, lang: str | None = None) -> HistoryEntry | None:
+        """Voce piu' vicina con la stessa lingua (a parita' di distanza la piu' recente)."""
+        with self._lock:
+            best = self._nearest(phash, lang)
+            if best is None:
+                return None
+            best_dist, best_id = best
+            row = self._db.execute(
+                "SELECT id, phash, ocr_text, qr_payload, lang, created_at FROM labels WHERE id = ?",
+                (best_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return HistoryEntry(row[0], int.from_bytes(row[1], "big"), row[2], row[3], row[4], row[5], best_dist)
+
+    def looks_same(self, entry_id: int, image: Image.Image) -> bool:
+        """
+        Seconda verifica, a risoluzione piu' alta dell'hash: differenza media
+        tra la miniatura salvata e quella dell'immagine nuova, in grigi.
+        """
+        saved = self.thumbnail(entry_id)
+        if saved is None:
+            return False
+        current = _make_thumbnail(image).convert("L")
+        saved = saved.convert("L")
+        if saved.size != current.size:
+            saved = saved.resize(current.size, Image.Resampling.BOX)
+        diff = ImageStat.Stat(ImageChops.difference(saved, current)).mean[0]
+        return diff <= HISTORY_VERIFY_MAX_DIFF
+
+    def add(self, phash: int, image: Image.Image, ocr_text: str, lang: str | None = None) -> int:
+        thumb = _encode_thumbnail(_make_thumbnail(image))
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT INTO labels (phash, ocr_text, lang, created_at, thumbnail) VALUES (?, ?, ?, ?, ?)",
+                (_hash_to_blob(phash), ocr_text, lang, time.time(), thumb),
+            )
+            self._db.commit()
+            entry_id = int(cur.lastrowid)
+            self._index(entry_id, phash, lang)
+        return entry_id
+
+    def set_qr_payload(self, entry_id: int, payload: str) -> None:
+        with self._lock:
+            self._db.execute("UPDATE labels SET qr_payload = ? WHERE id = ?", (payload, entry_id))
+            self._db.commit()
+
+    def thumbnail(self, entry_id: int) -> Image.Image | None:
+        with self._lock:
+            row = self._db.execute("SELECT thumbnail FROM labels WHERE id = ?", (entry_id,)).fetchone()
+        if not row or row[0] is None:
+            return None
+        return Image.open(io.BytesIO(row[0]))
+
+    def __len__(self) -> int:
+        return min(self._count, self.index_limit)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,228 @@
+"""
+Archivio delle immagini della sessione con limite di memoria.
+
+Per ogni immagine restano sempre in RAM solo una copia di lavoro ridotta
+(anteprima, hash percettivo) e una miniatura per la striscia "Acquisizioni
+recenti". Gli originali a piena risoluzione restano in RAM finche' stanno nel
+budget, che conta anche copie di lavoro e miniature; oltre, i meno usati
+vengono scritti come pixel RGBX grezzi in una cartella temporanea e tolti
+dalla memoria. La scrittura avviene su un thread dedicato, a bande di righe:
+`add` (chiamato dal thread Tk) non tocca mai il disco, e l'originale resta
+in RAM, e nel conto del budget, finche' il file non e' completo. RGBX e' il formato interno di Pillow per le immagini RGB (4
+byte per pixel), quindi `get_full` puo' mappare il file con `mmap` senza
+copiarlo: il sistema operativo carica le pagine solo quando vengono lette.
+Le immagini gia' piccole quanto la copia di lavoro non hanno un originale
+separato: la copia di lavoro e' l'originale.
+"""
+
+from __future__ import annotations
+
+import mmap
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+
+from PIL import Image
+
+from .config import (
+    IMAGE_STORE_MAX_ENTRIES,
+    IMAGE_STORE_RAM_MB,
+    IMAGE_STORE_THUMB_SIZE,
+    IMAGE_STORE_WORKING_SIZE,
+)
+
+
+@dataclass
+class StoredImage:
+    id: int
+    source: str
+    created_at: float
+    size: tuple[int, int]
+    working: Image.Image
+    thumbnail: Image.Image
+    spill_path: Path | None = None
+
+
+_SPILL_BAND_ROWS = 256  # righe scritte per volta: niente copia intera dell'originale
+
+# byte per pixel in memoria: Pillow tiene RGB (e gli altri modi a 3-4 bande) a 4 byte
+_PIXEL_BYTES = {"1": 1, "L": 1, "P": 1, "I;16": 2}
+
+
+def _nbytes(image: Image.Image) -> int:
+    return image.width * image.height * _PIXEL_BYTES.get(image.mode, 4)
+
+
+def _reduced(image: Image.Image, max_side: int) -> Image.Image:
+    # le immagini non vengono mai modificate in place: se e' gia' piccola si riusa
+    if max(image.size) <= max_side:
+        return image
+    scale = max_side / max(image.size)
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return image.resize(size, Image.Resampling.BOX)
+
+
+class SessionImageStore:
+    def __init__(
+        self,
+        ram_budget_mb: int = IMAGE_STORE_RAM_MB,
+        working_size: int = IMAGE_STORE_WORKING_SIZE,
+        max_entries: int = IMAGE_STORE_MAX_ENTRIES,
+    ):
+        self.ram_budget = ram_budget_mb * 1024 * 1024
+        self.working_size = working_size
+        self.max_entries = max_entries
+        self._dir: Path | None = None
+        self._entries: OrderedDict[int, StoredImage] = OrderedDict()
+        # originali in RAM, dal meno al piu' recentemente usato
+        self._originals: OrderedDict[int, Image.Image] = OrderedDict()
+        self._ram_used = 0
+        # scritture su disco in corso (id -> Future) e byte che libereranno
+        self._spilling: dict[int, Future] = {}
+        self._spilling_bytes = 0
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-spill")
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def add(self, image: Image.Image, source: str) -> int:
+        original = image if image.mode == "RGB" else image.convert("RGB")
+        working = _reduced(original, self.working_size)
+        thumb = _reduced(working, IMAGE_STORE_THUMB_SIZE)
+        with self._lock:
+            image_id = self._next_id
+            self._next_id += 1
+            entry = StoredImage(image_id, source, time.time(), original.size, working, thumb)
+            self._entries[image_id] = entry
+            self._ram_used += self._resident_bytes(entry)
+            if original is not working:
+                self._originals[image_id] = original
+                self._ram_used += _nbytes(original)
+            self._enforce_limits(keep=image_id)
+        return image_id
+
+    @staticmethod
+    def _resident_bytes(entry: StoredImage) -> int:
+        # copia di lavoro e miniatura restano in RAM finche' la voce esiste
+        used = _nbytes(entry.working)
+        if entry.thumbnail is not entry.working:
+            used += _nbytes(entry.thumbnail)
+        return used
+
+    def _enforce_limits(self, keep: int) -> None:
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+        for image_id in list(self._originals):
+            # si conta gia' liberato quello che sta per essere scritto su disco
+            if self._ram_used - self._spilling_bytes <= self.ram_budget:
+                break
+            # l'ultima immagine aggiunta resta in RAM anche se da sola supera il budget
+            if image_id != keep and image_id not in self._spilling:
+                self._spill(image_id)
+
+    def _spill(self, image_id: int) -> None:
+        original = self._originals[image_id]
+        if self._dir is None:
+            self._dir = Path(tempfile.mkdtemp(prefix="imagetobarcode-"))
+        path = self._dir / f"{image_id}.rgbx"
+        self._spilling_bytes += _nbytes(original)
+        self._spilling[image_id] = self._writer.submit(self._write_spill, image_id, original, path)
+
+    def _write_spill(self, image_id: int, original: Image.Image, path: Path) -> None:
+        # thread di scrittura: fuori dal lock, l'originale resta usabile da get_full
+        ok = True
+        try:
+            with open(path, "wb") as fh:
+                for top in range(0, original.height, _SPILL_BAND_ROWS):
+                    band = original.crop((0, top, original.width, min(original.height, top + _SPILL_BAND_ROWS)))
+                    fh.write(band.tobytes("raw", "RGBX"))
+        except OSError:
+            ok = False  # disco pieno o cartella rimossa: l'originale resta in RAM
+        with self._lock:
+            self._spilling.pop(image_id, None)
+            self._spilling_bytes -= _nbytes(original)
+            entry = self._entries.get(image_id)
+            if ok and entry is not None and self._originals.get(image_id) is original:
+                self._originals.pop(image_id)
+                self._ram_used -= _nbytes(original)
+                entry.spill_path = path
+                return
+        # voce eliminata (o archivio chiuso) durante la scrittura, oppure errore
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+    def _drop(self, image_id: int) -> None:
+        entry = self._entries.pop(image_id)
+        self._ram_used -= self._resident_bytes(entry)
+        original = self._originals.pop(image_id, None)
+        if original is not None:
+            self._ram_used -= _nbytes(original)
+        if entry.spill_path is not None:
+            try:
+                entry.spill_path.unlink()
+            except OSError:
+                # su Windows un file ancora mappato non si puo' cancellare: ci pensa close()
+                pass
+
+    def __contains__(self, image_id: object) -> bool:
+        return image_id in self._entries
+
+    def get(self, image_id: int) -> StoredImage:
+        with self._lock:
+            return self._entries[image_id]
+
+    def working(self, image_id: int) -> Image.Image:
+        return self.get(image_id).working
+
+    def get_full(self, image_id: int) -> Image.Image:
+        """
+        Originale a piena risoluzione. Se era su disco viene mappato, non
+        copiato: l'immagine e' in modo "RGBX" e in sola lettura; chi ha
+        bisogno di RGB (es. l'OCR) la converte.
+        """
+        with self._lock:
+            original = self._originals.get(image_id)
+            if original is not None:
+                self._originals.move_to_end(image_id)
+                return original
+            entry = self._entries[image_id]
+            if entry.spill_path is None:
+                return entry.working
+        with open(entry.spill_path, "rb") as fh:
+            mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        # frombuffer tiene un riferimento al mmap per tutta la vita dell'immagine
+        return Image.frombuffer("RGBX", entry.size, mapped, "raw", "RGBX", 0, 1)
+
+    def recent(self, count: int) -> list[StoredImage]:
+        with self._lock:
+            return list(self._entries.values())[-count:][::-1]
+
+    @property
+    def ram_used(self) -> int:
+        return self._ram_used
+
+    def flush_spills(self, timeout: float | None = None) -> bool:
+        """Attende le scritture su disco in corso; False se scade il timeout."""
+        with self._lock:
+            pending = list(self._spilling.values())
+        return not wait(pending, timeout=timeout).not_done
+
+    def close(self) -> None:
+        # la scrittura in corso viene completata, quelle in coda annullate
+        self._writer.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            self._spilling.clear()
+            self._spilling_bytes = 0
+            self._entries.clear()
+            self._originals.clear()
+            self._ram_used = 0
+            if self._dir is not None:
+                shutil.rmtree(self._dir, ignore_errors=True)
+                self._dir = None
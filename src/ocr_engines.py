@@ -0,0 +1,345 @@
+"""
+Motori OCR intercambiabili usati da `ocr_service`.
+
+Ogni motore espone `recognize_batch(images, lang)` e `status_text()`.
+I motori con dipendenze opzionali (tesserocr, onnxruntime) vengono creati
+solo se la libreria e' installata; `available_engines()` elenca quelli usabili.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Sequence
+
+from PIL import Image, ImageOps
+import pytesseract
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore[assignment]
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None  # type: ignore[assignment]
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None  # type: ignore[assignment]
+
+from .config import (
+    OCR_CLOSE_TIMEOUT_S,
+    OCR_WORKERS,
+    ONNX_REC_CHARSET,
+    ONNX_REC_MODEL,
+    ONNX_REC_USE_SPACE,
+)
+from .utils import bundle_base_dir
+
+
+class OcrEngine(ABC):
+    name = ""
+    label = ""
+
+    @staticmethod
+    def is_available() -> bool:
+        return True
+
+    def recognize(self, image: Image.Image, lang: str) -> str:
+        return self.recognize_batch([image], lang)[0]
+
+    @abstractmethod
+    def recognize_batch(self, images: Sequence[Image.Image], lang: str) -> list[str]: ...
+
+    @abstractmethod
+    def status_text(self) -> str: ...
+
+    def close(self) -> None:
+        """Libera le risorse native del motore; di default non c'e' nulla da liberare."""
+
+
+class TesseractCliEngine(OcrEngine):
+    """
+    Tesseract tramite pytesseract. Un batch di piu' immagini viene passato a
+    un solo processo tesseract con un file elenco (una immagine per riga):
+    l'avvio del processo e il caricamento dei traineddata si pagano una volta.
+    """
+
+    name = "tesseract"
+    label = "Tesseract (CLI)"
+
+    @staticmethod
+    def is_available() -> bool:
+        try:
+            pytesseract.get_tesseract_version()
+            return True
+        except Exception:
+            return False
+
+    def recognize_batch(self, images: Sequence[Image.Image], lang: str) -> list[str]:
+        if len(images) <= 1:
+            return [pytesseract.image_to_string(img, lang=lang).strip() for img in images]
+        with tempfile.TemporaryDirectory(prefix="ocr-batch-") as tmp:
+            tmp_dir = Path(tmp)
+            paths = []
+            for i, img in enumerate(images):
+                path = tmp_dir / f"{i:04d}.png"
+                img.save(path, format="PNG", compress_level=1)
+                paths.append(str(path))
+            list_file = tmp_dir / "images.txt"
+            list_file.write_text("\n".join(paths) + "\n", encoding="utf-8")
+            out_base = tmp_dir / "out"
+            pytesseract.pytesseract.run_tesseract(str(list_file), str(out_base), "txt", lang)
+            text = (tmp_dir / "out.txt").read_text(encoding="utf-8")
+        pages = split_pages(text, len(images))
+        if pages is None:
+            return [pytesseract.image_to_string(img, lang=lang).strip() for img in images]
+        return pages
+
+    def status_text(self) -> str:
+        try:
+            return f"Tesseract: {pytesseract.get_tesseract_version()}"
+        except Exception:
+            return "Tesseract: NON trovato"
+
+
+class LibTesseractEngine(OcrEngine):
+    """
+    libtesseract in-process tramite tesserocr.
+    Le API, inizializzate una volta sola per lingua, vengono riusate: evita
+    l'avvio del processo e il caricamento dei traineddata a ogni immagine.
+    PyTessBaseAPI non e' thread-safe, quindi ogni chiamata prende in
+    prestito un'API libera (creandone una se sono tutte occupate): thread
+    diversi riconoscono in parallelo e le API sono al massimo tante quanti i
+    thread OCR. L'API riconosce un'immagine per volta, quindi il batch e' un
+    ciclo su `SetImage` con la stessa istanza.
+    """
+
+    name = "libtesseract"
+    label = "Tesseract (libreria)"
+
+    def __init__(self):
+        self._idle: dict[str, list["tesserocr.PyTessBaseAPI"]] = {}
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @staticmethod
+    def is_available() -> bool:
+        return tesserocr is not None
+
+    @staticmethod
+    def _create_api(lang: str):
+        tessdata = os.environ.get("TESSDATA_PREFIX")
+        if tessdata:
+            return tesserocr.PyTessBaseAPI(path=tessdata, lang=lang)
+        return tesserocr.PyTessBaseAPI(lang=lang)
+
+    def _acquire(self, lang: str):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Motore OCR chiuso")
+            self._in_use += 1
+            idle = self._idle.get(lang)
+            if idle:
+                return idle.pop()
+        try:
+            return self._create_api(lang)
+        except BaseException:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify_all()
+            raise
+
+    def _release(self, lang: str, api) -> None:
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify_all()
+            if not self._closed:
+                self._idle.setdefault(lang, []).append(api)
+                return
+        # restituita dopo close(): nessuno la riusera'
+        api.End()
+
+    def recognize_batch(self, images: Sequence[Image.Image], lang: str) -> list[str]:
+        api = self._acquire(lang)
+        try:
+            results = []
+            for img in images:
+                api.SetImage(img)
+                results.append(api.GetUTF8Text().strip())
+            return results
+        finally:
+            self._release(lang, api)
+
+    def status_text(self) -> str:
+        try:
+            return f"libtesseract: {tesserocr.tesseract_version().splitlines()[0]}"
+        except Exception:
+            return "libtesseract: NON trovato"
+
+    def close(self) -> None:
+        # le API ancora in uso vengono chiuse da _release quando tornano
+        with self._cond:
+            self._closed = True
+            self._cond.wait_for(lambda: self._in_use == 0, timeout=OCR_CLOSE_TIMEOUT_S)
+            apis = [api for idle in self._idle.values() for api in idle]
+            self._idle.clear()
+        for api in apis:
+            api.End()
+
+
+class OnnxRecognizerEngine(OcrEngine):
+    """
+    Riconoscitore di righe di testo (CRNN / PP-OCR rec) su ONNX Runtime CPU.
+
+    Il modello e' addestrato su singole righe: l'immagine viene divisa in
+    bande orizzontali di testo (profilo di proiezione) e le bande vengono
+    riconosciute in un unico batch. Uscita CTC decodificata in modo greedy,
+    con indice 0 = blank e il charset a partire dall'indice 1 (formato PP-OCR).
+    La lingua viene ignorata: il vocabolario e' quello del charset.
+    """
+
+    name = "onnx"
+    label = "ONNX (CPU)"
+
+    def __init__(self, model_path: Path | None = None, charset_path: Path | None = None):
+        base = bundle_base_dir()
+        self.model_path = model_path or base / ONNX_REC_MODEL
+        charset_path = charset_path or base / ONNX_REC_CHARSET
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # la sessione e' unica ma `run` viene chiamato in parallelo dai thread
+        # OCR: ognuno usa una quota dei core invece di tutti
+        opts.intra_op_num_threads = max(1, (os.cpu_count() or 1) // max(1, OCR_WORKERS))
+        self._session = ort.InferenceSession(
+            str(self.model_path), sess_options=opts, providers=["CPUExecutionProvider"]
+        )
+        inp = self._session.get_inputs()[0]
+        self._input_name = inp.name
+        _, channels, height, width = inp.shape
+        self._channels = channels if isinstance(channels, int) else 3
+        self._height = height if isinstance(height, int) else 48
+        self._fixed_width = width if isinstance(width, int) else None
+        chars = charset_path.read_text(encoding="utf-8").splitlines()
+        if ONNX_REC_USE_SPACE:
+            chars.append(" ")
+        self._charset = ["", *chars]
+
+    @staticmethod
+    def is_available() -> bool:
+        if ort is None or np is None:
+            return False
+        base = bundle_base_dir()
+        return (base / ONNX_REC_MODEL).is_file() and (base / ONNX_REC_CHARSET).is_file()
+
+    def recognize_batch(self, images: Sequence[Image.Image], lang: str) -> list[str]:
+        crops: list[Image.Image] = []
+        owners: list[int] = []
+        for i, img in enumerate(images):
+            for line in split_text_lines(img):
+                crops.append(line)
+                owners.append(i)
+        lines = self._recognize_lines(crops) if crops else []
+        results: list[list[str]] = [[] for _ in images]
+        for owner, text in zip(owners, lines):
+            if text:
+                results[owner].append(text)
+        return ["\n".join(r) for r in results]
+
+    def _recognize_lines(self, crops: Sequence[Image.Image]) -> list[str]:
+        h = self._height
+        mode = "L" if self._channels == 1 else "RGB"
+        resized = []
+        for crop in crops:
+            w = max(1, round(crop.width * h / max(1, crop.height)))
+            if self._fixed_width:
+                w = min(w, self._fixed_width)
+            resized.append(crop.convert(mode).resize((w, h), Image.Resampling.BILINEAR))
+        batch_w = self._fixed_width or max(im.width for im in resized)
+        batch = np.zeros((len(resized), self._channels, h, batch_w), dtype=np.float32)
+        for i, im in enumerate(resized):
+            arr = np.asarray(im, dtype=np.float32) / 127.5 - 1.0
+            if arr.ndim == 2:
+                arr = arr[None, :, :]
+            else:
+                # i modelli PP-OCR sono addestrati su immagini cv2, quindi BGR
+                arr = arr[:, :, ::-1].transpose(2, 0, 1)
+            batch[i, :, :, : im.width] = arr
+        # InferenceSession.run e' thread-safe: nessun lock
+        probs = self._session.run(None, {self._input_name: batch})[0]
+        return [ctc_decode(seq.tolist(), self._charset) for seq in probs.argmax(axis=2)]
+
+    def status_text(self) -> str:
+        return f"ONNX: {self.model_path.name} (CPU)"
+
+
+def split_pages(text: str, count: int) -> list[str] | None:
+    """
+    Divide l'uscita di un batch tesseract nelle pagine (separate da form
+    feed). None se il numero di pagine non corrisponde alle immagini.
+    """
+    pages = text.split("\f")
+    if pages and not pages[-1].strip():
+        pages.pop()
+    if len(pages) != count:
+        return None
+    return [page.strip() for page in pages]
+
+
+def ctc_decode(indices: Sequence[int], charset: Sequence[str]) -> str:
+    """Decodifica CTC greedy: si fondono le ripetizioni e si scartano i blank (indice 0)."""
+    out = []
+    prev = 0
+    for idx in indices:
+        if idx != prev and idx != 0 and idx < len(charset):
+            out.append(charset[idx])
+        prev = idx
+    return "".join(out).strip()
+
+
+def split_text_lines(image: Image.Image, min_height: int = 8, pad: int = 4) -> list[Image.Image]:
+    """
+    Divide l'immagine in righe di testo usando il profilo orizzontale dei
+    pixel scuri. Se non trova bande restituisce l'immagine intera.
+    """
+    gray = np.asarray(ImageOps.grayscale(image), dtype=np.uint8)
+    if gray.size == 0:
+        return []
+    # Testo scuro su fondo chiaro; se lo sfondo e' scuro si inverte
+    if gray.mean() < 128:
+        gray = 255 - gray
+    ink = gray < (int(gray.mean()) - 40)
+    rows = ink.sum(axis=1) > max(2, gray.shape[1] // 200)
+    lines: list[Image.Image] = []
+    start = None
+    for y, has_ink in enumerate([*rows.tolist(), False]):
+        if has_ink and start is None:
+            start = y
+        elif not has_ink and start is not None:
+            if y - start >= min_height:
+                cols = np.flatnonzero(ink[start:y].any(axis=0))
+                x0 = max(0, int(cols[0]) - pad)
+                x1 = min(gray.shape[1], int(cols[-1]) + 1 + pad)
+                y0 = max(0, start - pad)
+                y1 = min(gray.shape[0], y + pad)
+                lines.append(image.crop((x0, y0, x1, y1)))
+            start = None
+    return lines or [image]
+
+
+ENGINE_CLASSES: dict[str, type[OcrEngine]] = {
+    OnnxRecognizerEngine.name: OnnxRecognizerEngine,
+    LibTesseractEngine.name: LibTesseractEngine,
+    TesseractCliEngine.name: TesseractCliEngine,
+}
+
+
+def available_engines() -> list[str]:
+    return [name for name, cls in ENGINE_CLASSES.items() if cls.is_available()]
@@ -2,12 +2,15 @@ from __future__ import annotations
 
 import os
 import sys
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Sequence
 
 from PIL import Image
 import pytesseract
 
+from . import ocr_engines
+from .config import OCR_ENGINE
 from .utils import bundle_base_dir
 
 
@@ -55,16 +58,72 @@ def configure_embedded_tesseract() -> None:
             return
 
 
+_engine_name: str = OCR_ENGINE
+_engines: dict[str, ocr_engines.OcrEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def available_engines() -> list[str]:
+    return ocr_engines.available_engines()
+
+
+def engine_label(name: str) -> str:
+    cls = ocr_engines.ENGINE_CLASSES.get(name)
+    return cls.label if cls else name
+
+
+def set_engine(name: str) -> None:
+    global _engine_name
+    if name != "auto" and name not in ocr_engines.ENGINE_CLASSES:
+        raise ValueError(f"Motore OCR sconosciuto: {name}")
+    _engine_name = name
+
+
+def selected_engine_name() -> str:
+    if _engine_name != "auto":
+        return _engine_name
+    available = available_engines()
+    return available[0] if available else ocr_engines.TesseractCliEngine.name
+
+
+def get_engine() -> ocr_engines.OcrEngine:
+    # I motori (modello ONNX, API libtesseract) si caricano una volta sola
+    name = selected_engine_name()
+    with _engines_lock:
+        engine = _engines.get(name)
+        if engine is None:
+            engine = ocr_engines.ENGINE_CLASSES[name]()
+            _engines[name] = engine
+        return engine
+
+
+def close_engines() -> None:
+    """Chiude i motori caricati (API libtesseract, sessioni ONNX); all'uscita dall'app."""
+    with _engines_lock:
+        engines = list(_engines.values())
+        _engines.clear()
+    for engine in engines:
+        try:
+            engine.close()
+        except Exception:
+            pass
+
+
 def tesseract_status_text() -> str:
     try:
-        ver = pytesseract.get_tesseract_version()
-        return f"Tesseract: {ver}"
+        return get_engine().status_text()
     except Exception:
-        return "Tesseract: NON trovato"
+        return f"{engine_label(selected_engine_name())}: NON disponibile"
 
 
 def run_ocr(image: Image.Image, lang: str) -> str:
-    return pytesseract.image_to_string(image, lang=lang).strip()
+    return get_engine().recognize(image, lang)
+
+
+def run_ocr_batch(images: Sequence[Image.Image], lang: str) -> list[str]:
+    if not images:
+        return []
+    return get_engine().recognize_batch(images, lang)
 
 
 # Configure on import for convenience (matches previous behavior)
@@ -0,0 +1,337 @@
+"""
+Modalita' multi-postazione: piu' camere gestite dallo stesso processo.
+
+Ogni `Station` ha un proprio thread di acquisizione, che e' l'unico a usare
+il suo `cv2.VideoCapture`: una camera che si blocca in `read()` ferma solo
+quel thread. OCR e generazione QR girano nel `OcrWorkerPool` condiviso
+(e nella cache di `codegen`); ogni postazione ha al massimo un lavoro in
+corso, anche dopo un timeout, cosi' una postazione lenta non puo' occupare
+piu' di un thread del pool. Il motore OCR e' quello condiviso di
+`ocr_service` (modello caricato una volta): i motori accettano chiamate in
+parallelo, vedi `ocr_engines`.
+
+Come per `export_service`, i thread non chiamano mai Tk: la UI legge
+`latest_preview()` e `stats()` e raccoglie i risultati con `poll_results()`.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+
+from PIL import Image
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None  # type: ignore[assignment]
+
+from . import camera_profile, codegen, ocr_service
+from .config import (
+    OCR_WORKERS,
+    STATION_CAPTURE_TIMEOUT_S,
+    STATION_QR_SIZE,
+    STATION_RECONNECT_S,
+    STATION_STALL_S,
+    STATION_TILE_SIZE,
+)
+
+
+@dataclass
+class StationResult:
+    station_id: int
+    text: str
+    qr: Image.Image | None
+    error: Exception | None
+    latency_s: float
+    image_size: tuple[int, int]
+
+
+@dataclass
+class StationStats:
+    fps: float
+    read_ms: float
+    frame_age_s: float | None
+    ocr_done: int
+    ocr_per_min: float
+    ocr_avg_ms: float
+    busy: bool
+    stalled: bool
+    error: str | None
+
+
+class OcrWorkerPool:
+    def __init__(self, workers: int = OCR_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ocr")
+
+    def submit(self, image: Image.Image, lang: str) -> Future:
+        return self._executor.submit(ocr_service.run_ocr, image, lang)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        # all'uscita: i motori condivisi attendono gli OCR in corso prima di chiudersi
+        ocr_service.close_engines()
+
+
+class Station:
+    def __init__(
+        self,
+        station_id: int,
+        camera_index: int,
+        profile: camera_profile.CameraProfile,
+        pool: OcrWorkerPool,
+        results: queue.Queue,
+    ):
+        self.station_id = station_id
+        self.camera_index = camera_index
+        self.profile = profile
+        self._pool = pool
+        self._results = results
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._cap = None
+        self._mode: camera_profile.CameraMode | None = None
+        self._timer = camera_profile.FrameTimer()
+        self._frame: Image.Image | None = None
+        self._preview: Image.Image | None = None
+        self._last_frame_at: float | None = None
+        self._error: str | None = None
+        self._still_request: Future | None = None
+        self._busy_since: float | None = None
+        # lavori realmente in corso: restano tracciati anche dopo il timeout
+        self._still_future: Future | None = None
+        self._ocr_future: Future | None = None
+        self._ocr_times: deque[float] = deque(maxlen=240)
+        self._ocr_done = 0
+        self._ocr_total_s = 0.0
+        self._thread = threading.Thread(target=self._run, name=f"station-{station_id}", daemon=True)
+
+    @property
+    def mode(self) -> camera_profile.CameraMode | None:
+        return self._mode
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def join(self, timeout: float | None = None) -> None:
+        self._thread.join(timeout)
+
+    # ---- thread di acquisizione ----
+    def _open(self) -> bool:
+        backend = getattr(cv2, "CAP_DSHOW", getattr(cv2, "CAP_ANY", 0))
+        try:
+            cap = cv2.VideoCapture(self.camera_index, backend)
+        except Exception as exc:
+            self._error = f"Errore apertura camera: {exc}"
+            return False
+        if not cap or not cap.isOpened():
+            if cap:
+                cap.release()
+            self._error = "Impossibile aprire la camera"
+            return False
+        self._mode = camera_profile.negotiate(cap, self.profile.fourcc, self.profile.preview_size)
+        self._cap = cap
+        self._error = None
+        return True
+
+    def _release(self) -> None:
+        if self._cap is not None:
+            try:
+                self._cap.release()
+            except Exception:
+                pass
+            self._cap = None
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                if self._cap is None and not self._open():
+                    self._stop.wait(STATION_RECONNECT_S)
+                    continue
+                with self._lock:
+                    request, self._still_request = self._still_request, None
+                if request is not None:
+                    self._serve_still(request)
+                    continue
+                image, read_s = camera_profile.read_frame(self._cap)
+                if image is None:
+                    self._error = "Errore lettura webcam, riconnessione..."
+                    self._release()
+                    self._stop.wait(STATION_RECONNECT_S)
+                    continue
+                preview = image.copy()
+                preview.thumbnail(STATION_TILE_SIZE)
+                with self._lock:
+                    self._frame = image
+                    self._preview = preview
+                    self._last_frame_at = time.perf_counter()
+                    self._timer.update(read_s)
+        finally:
+            self._release()
+
+    def _serve_still(self, request: Future) -> None:
+        try:
+            still, _mode = camera_profile.grab_still(self._cap, self.profile, restore_preview=True)
+        except Exception:
+            still = None
+        if still is None:
+            with self._lock:
+                still = self._frame
+        if still is None:
+            request.set_exception(RuntimeError("Nessun fotogramma disponibile"))
+        else:
+            request.set_result(still)
+
+    # ---- pipeline OCR/QR ----
+    def request_capture(self, lang: str) -> bool:
+        """Avvia scatto + OCR + QR; False se la postazione e' gia' occupata."""
+        with self._lock:
+            if self._busy_since is not None or self._cap is None or self._has_inflight():
+                return False
+            self._busy_since = time.perf_counter()
+            request: Future = Future()
+            self._still_request = request
+            self._still_future = request
+            started = self._busy_since
+        request.add_done_callback(lambda f: self._on_still(f, lang, started))
+        return True
+
+    def _has_inflight(self) -> bool:
+        return any(f is not None and not f.done() for f in (self._still_future, self._ocr_future))
+
+    def _on_still(self, still_future: Future, lang: str, started: float) -> None:
+        try:
+            image = still_future.result()
+        except Exception as exc:
+            self._finish(started, "", None, exc, (0, 0))
+            return
+        try:
+            ocr_future = self._pool.submit(image, lang)
+        except RuntimeError as exc:
+            # pool gia' chiuso (uscita dall'app)
+            self._finish(started, "", None, exc, image.size)
+            return
+        with self._lock:
+            self._ocr_future = ocr_future
+        ocr_future.add_done_callback(lambda f: self._on_ocr(f, started, image.size))
+
+    def _on_ocr(self, ocr_future: Future, started: float, size: tuple[int, int]) -> None:
+        qr = None
+        error = None
+        text = ""
+        try:
+            text = ocr_future.result()
+            if text:
+                qr = codegen.generate_qrcode_cached(text, *STATION_QR_SIZE)
+        except Exception as exc:
+            error = exc
+        self._finish(started, text, qr, error, size)
+
+    def _finish(
+        self,
+        started: float,
+        text: str,
+        qr: Image.Image | None,
+        error: Exception | None,
+        size: tuple[int, int],
+    ) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            # risultato arrivato dopo il timeout: la postazione e' gia' stata liberata
+            if self._busy_since != started:
+                return
+            self._busy_since = None
+            # postazione fermata: la tessera con questo id appartiene ormai a un altro avvio
+            if self._stop.is_set():
+                return
+            if error is None:
+                self._ocr_done += 1
+                self._ocr_total_s += now - started
+                self._ocr_times.append(now)
+        self._results.put(StationResult(self.station_id, text, qr, error, now - started, size))
+
+    # ---- lettura stato dalla UI ----
+    def latest_preview(self) -> Image.Image | None:
+        with self._lock:
+            return self._preview
+
+    def stats(self) -> StationStats:
+        now = time.perf_counter()
+        timed_out = False
+        abandoned: Future | None = None
+        with self._lock:
+            if self._busy_since is not None and now - self._busy_since > STATION_CAPTURE_TIMEOUT_S:
+                self._busy_since = None
+                # richiesta mai presa dal thread di acquisizione: si annulla fuori dal lock,
+                # perche' i callback del Future lo riacquisiscono
+                abandoned, self._still_request = self._still_request, None
+                timed_out = True
+            while self._ocr_times and now - self._ocr_times[0] > 60.0:
+                self._ocr_times.popleft()
+            age = None if self._last_frame_at is None else now - self._last_frame_at
+            stats = StationStats(
+                fps=self._timer.fps,
+                read_ms=self._timer.read_ms,
+                frame_age_s=age,
+                ocr_done=self._ocr_done,
+                ocr_per_min=float(len(self._ocr_times)),
+                ocr_avg_ms=(self._ocr_total_s / self._ocr_done * 1000) if self._ocr_done else 0.0,
+                busy=self._busy_since is not None or self._has_inflight(),
+                stalled=age is not None and age > STATION_STALL_S,
+                error=self._error,
+            )
+        if abandoned is not None:
+            abandoned.cancel()
+        if timed_out and not self._stop.is_set():
+            self._results.put(
+                StationResult(
+                    self.station_id, "", None, TimeoutError("Scatto non completato"), STATION_CAPTURE_TIMEOUT_S, (0, 0)
+                )
+            )
+        return stats
+
+
+class StationManager:
+    def __init__(self, workers: int = OCR_WORKERS):
+        self.pool = OcrWorkerPool(workers)
+        self.stations: list[Station] = []
+        self._results: queue.Queue[StationResult] = queue.Queue()
+
+    def start(self, camera_indices: list[int], profile: camera_profile.CameraProfile) -> None:
+        self.stop()
+        # coda nuova a ogni avvio: gli OCR ancora in corso delle postazioni
+        # precedenti (stessi id) scrivono nella vecchia, che nessuno legge piu'
+        self._results = queue.Queue()
+        self.stations = [
+            Station(i, idx, profile, self.pool, self._results) for i, idx in enumerate(camera_indices)
+        ]
+        for station in self.stations:
+            station.start()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        for station in self.stations:
+            station.stop()
+        # una camera bloccata in read() non deve trattenere la chiusura: i thread sono daemon
+        deadline = time.perf_counter() + timeout
+        for station in self.stations:
+            station.join(max(0.0, deadline - time.perf_counter()))
+        self.stations = []
+
+    def poll_results(self) -> list[StationResult]:
+        results: list[StationResult] = []
+        while True:
+            try:
+                results.append(self._results.get_nowait())
+            except queue.Empty:
+                return results
+
+    def shutdown(self) -> None:
+        self.stop()
+        self.pool.shutdown()
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import threading
+import time
 import tkinter as tk
+from concurrent.futures import Future
 from pathlib import Path
 from tkinter import filedialog, messagebox, ttk
 
@@ -12,9 +14,17 @@ try:
 except ImportError:
     cv2 = None  # type: ignore[assignment]
 
-from .. import codegen, ocr_service
-from ..config import APP_TITLE, SUPPORTED_IMAGES
+from .. import camera_profile, codegen, export_service, history_store, image_store, ocr_service, stations
+from ..config import (
+    APP_TITLE,
+    CAMERA_STATUS_INTERVAL_S,
+    EXPORT_CLOSE_TIMEOUT_S,
+    RECENT_CAPTURES_SHOWN,
+    STATION_COLUMNS,
+    SUPPORTED_IMAGES,
+)
 from ..utils import bundle_base_dir
+from .station_tile import StationTile
 
 
 class App(tk.Tk):
@@ -24,8 +34,11 @@ class App(tk.Tk):
         self.geometry("950x620")
         self.minsize(820, 500)
 
-        # immagini
-        self.loaded_image: Image.Image | None = None
+        # immagini: gli originali stanno nell'archivio di sessione (vedi loaded_image)
+        self._image_store = image_store.SessionImageStore()
+        self._current_image_id: int | None = None
+        self.recent_frame: ttk.Frame | None = None
+        self._recent_photos: list[ImageTk.PhotoImage] = []
         self.tk_preview: ImageTk.PhotoImage | None = None
         self.generated_image: Image.Image | None = None
         self.tk_generated_preview: ImageTk.PhotoImage | None = None
@@ -39,6 +52,8 @@ class App(tk.Tk):
         self.btn_open: ttk.Button | None = None
         self.btn_ocr: ttk.Button | None = None
         self.lang_combo: ttk.Combobox | None = None  # non più mostrata; rimane per compatibilità
+        self.engine_combo: ttk.Combobox | None = None
+        self._engine_names: list[str] = []
         self.ocr_progress: ttk.Progressbar | None = None
         self.nb: ttk.Notebook | None = None
         self.page2: ttk.Frame | None = None
@@ -54,11 +69,61 @@ class App(tk.Tk):
         self._camera_capture: cv2.VideoCapture | None = None
         self._camera_preview_job: str | None = None
         self._live_camera_image: Image.Image | None = None
+        self.profile_combo: ttk.Combobox | None = None
+        self._camera_profiles = camera_profile.load_profiles()
+        self._camera_profile = self._camera_profiles[0]
+        self._camera_mode: camera_profile.CameraMode | None = None
+        self._camera_timer: camera_profile.FrameTimer | None = None
+        self._camera_status_at = 0.0
+        # scatto ad alta risoluzione in corso (thread dedicato, raccolto con after).
+        # _camera_grab resta impostato finche' il thread usa la camera, anche se
+        # nel frattempo l'anteprima e' stata fermata e lo scatto va scartato.
+        self._still_future: Future | None = None
+        self._camera_grab: Future | None = None
+        self._still_fallback: Image.Image | None = None
+        self.btn_camera_refresh: ttk.Button | None = None
+        self.export_status: ttk.Label | None = None
+        self._exporter = export_service.ExportWriter()
+        self._export_poll_job: str | None = None
+        # storico etichette: se il database non si apre l'app funziona comunque senza.
+        # L'indice si carica in background (vedi _open_history) per non ritardare l'avvio.
+        self._history: history_store.HistoryStore | None = None
+        self._history_future: Future = Future()
+        self.use_history_var = tk.BooleanVar(value=False)
+        self.history_check: ttk.Checkbutton | None = None
+        self.history_status: ttk.Label | None = None
+        self._history_entry_id: int | None = None
+        self._last_qr_text: str | None = None
+        # multi-postazione: un thread per camera, pool OCR condiviso
+        self._station_manager = stations.StationManager()
+        self._station_tiles: dict[int, StationTile] = {}
+        self._station_poll_job: str | None = None
+        self.stations_frame: ttk.Frame | None = None
+        self.stations_summary: ttk.Label | None = None
+        self.btn_stations_start: ttk.Button | None = None
+        self.btn_stations_stop: ttk.Button | None = None
 
         self._build_ui()
         self.protocol("WM_DELETE_WINDOW", self._on_close)
+        self._open_history()
         self.after(100, self._refresh_cameras)
 
+    @property
+    def loaded_image(self) -> Image.Image | None:
+        # piena risoluzione: se l'originale e' stato scaricato su disco viene rimappato qui
+        if self._current_image_id is None or self._current_image_id not in self._image_store:
+            return None
+        return self._image_store.get_full(self._current_image_id)
+
+    def _set_input_image(self, image: Image.Image, source: str):
+        self._current_image_id = self._image_store.add(image, source)
+        self._refresh_recent_strip()
+
+    def _working_image(self) -> Image.Image | None:
+        if self._current_image_id is None or self._current_image_id not in self._image_store:
+            return None
+        return self._image_store.working(self._current_image_id)
+
     # ---------------- UI ----------------
     def _build_ui(self):
         top = ttk.Frame(self, padding=8)
@@ -74,6 +139,21 @@ class App(tk.Tk):
         self.tess_status = ttk.Label(top, text=ocr_service.tesseract_status_text())
         self.tess_status.pack(side=tk.RIGHT)
 
+        # Selettore motore OCR (solo quelli disponibili)
+        self._engine_names = ocr_service.available_engines() or [ocr_service.selected_engine_name()]
+        self.engine_combo = ttk.Combobox(
+            top,
+            state="readonly",
+            width=20,
+            values=[ocr_service.engine_label(n) for n in self._engine_names],
+        )
+        current = ocr_service.selected_engine_name()
+        if current in self._engine_names:
+            self.engine_combo.current(self._engine_names.index(current))
+        self.engine_combo.bind("<<ComboboxSelected>>", self._on_engine_selected)
+        self.engine_combo.pack(side=tk.RIGHT, padx=(0, 12))
+        ttk.Label(top, text="Motore OCR:").pack(side=tk.RIGHT, padx=(0, 4))
+
         # Notebook con passi (1) Scegli immagine, (2) OCR & QR
         self.nb = ttk.Notebook(self)
         self.nb.pack(fill=tk.BOTH, expand=True)
@@ -89,7 +169,15 @@ class App(tk.Tk):
         self.camera_combo = ttk.Combobox(cam_row, state="disabled", width=28)
         self.camera_combo.pack(side=tk.LEFT, padx=(6, 0))
         self.camera_combo.bind("<<ComboboxSelected>>", self._on_camera_selected)
-        ttk.Button(cam_row, text="Aggiorna", command=self._refresh_cameras).pack(side=tk.LEFT, padx=4)
+        self.btn_camera_refresh = ttk.Button(cam_row, text="Aggiorna", command=self._refresh_cameras)
+        self.btn_camera_refresh.pack(side=tk.LEFT, padx=4)
+        ttk.Label(cam_row, text="Profilo:").pack(side=tk.LEFT, padx=(12, 0))
+        self.profile_combo = ttk.Combobox(
+            cam_row, state="readonly", width=24, values=[p.name for p in self._camera_profiles]
+        )
+        self.profile_combo.current(0)
+        self.profile_combo.pack(side=tk.LEFT, padx=(6, 0))
+        self.profile_combo.bind("<<ComboboxSelected>>", self._on_profile_selected)
         cam_btns = ttk.Frame(cam_box)
         cam_btns.pack(fill=tk.X, pady=(6, 0))
         self.btn_camera_preview = ttk.Button(
@@ -111,6 +199,10 @@ class App(tk.Tk):
         self.canvas_in.pack(fill=tk.BOTH, expand=True, pady=(4, 8))
 
         self.canvas_in.bind("<Configure>", lambda e: self._render_input_preview())
+        recent_box = ttk.Labelframe(page1, text="Acquisizioni recenti (clic per riaprire)", padding=(6, 4))
+        recent_box.pack(fill=tk.X)
+        self.recent_frame = ttk.Frame(recent_box)
+        self.recent_frame.pack(fill=tk.X)
 
         # Pagina 2: OCR + Generazione QR
         self.page2 = ttk.Frame(self.nb, padding=(8, 8, 8, 8))
@@ -122,6 +214,15 @@ class App(tk.Tk):
         self.ocr_progress = ttk.Progressbar(bar, mode="indeterminate", length=140)
         ttk.Button(bar, text="Annulla", command=lambda: self.safe_undo()).pack(side=tk.LEFT, padx=4)
         ttk.Button(bar, text="Ripristina", command=lambda: self.safe_redo()).pack(side=tk.LEFT)
+        self.history_check = ttk.Checkbutton(
+            bar,
+            text="Usa storico",
+            variable=self.use_history_var,
+            state=tk.DISABLED,  # abilitato quando lo storico e' pronto
+        )
+        self.history_check.pack(side=tk.LEFT, padx=(8, 0))
+        self.history_status = ttk.Label(bar, text="", foreground="#b35900")
+        self.history_status.pack(side=tk.LEFT, padx=(8, 0))
 
         # Impostazioni QR a destra della barra
         settings = ttk.Frame(bar)
@@ -131,6 +232,8 @@ class App(tk.Tk):
         ttk.Label(settings, text="Altezza px:").pack(side=tk.LEFT)
         ttk.Spinbox(settings, from_=64, to=4096, width=6, textvariable=self.h_var).pack(side=tk.LEFT, padx=(4, 12))
         ttk.Button(settings, text="Salva immagine", command=self.on_save).pack(side=tk.LEFT)
+        self.export_status = ttk.Label(settings, text="", foreground="#555")
+        self.export_status.pack(side=tk.LEFT, padx=(8, 0))
 
         # Split orizzontale con testo (sinistra) e anteprima QR (destra)
         split = ttk.Panedwindow(self.page2, orient=tk.HORIZONTAL)
@@ -173,6 +276,24 @@ class App(tk.Tk):
         self.canvas_out.pack(fill=tk.BOTH, expand=True)
         self.canvas_out.bind("<Configure>", lambda e: self._render_output_preview())
 
+        # Pagina 3: piu' camere contemporaneamente
+        page3 = ttk.Frame(self.nb, padding=(8, 8, 8, 8))
+        self.nb.add(page3, text="3. Multi-postazione")
+        st_bar = ttk.Frame(page3)
+        st_bar.pack(fill=tk.X)
+        self.btn_stations_start = ttk.Button(st_bar, text="Avvia postazioni", command=self.on_start_stations)
+        self.btn_stations_start.pack(side=tk.LEFT)
+        self.btn_stations_stop = ttk.Button(
+            st_bar, text="Ferma postazioni", command=self._stop_stations, state=tk.DISABLED
+        )
+        self.btn_stations_stop.pack(side=tk.LEFT, padx=4)
+        self.stations_summary = ttk.Label(
+            st_bar, text="Una postazione per ogni camera rilevata; la lingua OCR e' quella dell'ultimo OCR."
+        )
+        self.stations_summary.pack(side=tk.LEFT, padx=(8, 0))
+        self.stations_frame = ttk.Frame(page3)
+        self.stations_frame.pack(fill=tk.BOTH, expand=True, pady=(8, 0))
+
     # -------- util --------
     def safe_undo(self):
         try:
@@ -187,6 +308,13 @@ class App(tk.Tk):
             pass
 
     # -------- logica --------
+    def _on_engine_selected(self, event=None):
+        idx = self.engine_combo.current()
+        if not 0 <= idx < len(self._engine_names):
+            return
+        ocr_service.set_engine(self._engine_names[idx])
+        self.tess_status.config(text=ocr_service.tesseract_status_text())
+
     def toggle_lang(self):
         # mantenuta per retro-compatibilità; ora si usa la combobox
         new_lang = "ita" if self.lang_var.get() == "eng" else "eng"
@@ -205,8 +333,9 @@ class App(tk.Tk):
         if not path:
             return
         try:
-            img = Image.open(path)
-            self.loaded_image = ImageOps.exif_transpose(img.convert("RGB"))
+            with Image.open(path) as img:
+                image = ImageOps.exif_transpose(img.convert("RGB"))
+            self._set_input_image(image, Path(path).name)
             self._after_new_input_image()
         except Exception as e:
             messagebox.showerror("Errore", str(e))
@@ -216,6 +345,9 @@ class App(tk.Tk):
         self._goto_step2()
         self._preview_enabled = False
         self.generated_image = None
+        self._history_entry_id = None
+        self._last_qr_text = None
+        self._set_history_status("")
         if hasattr(self, "canvas_out"):
             try:
                 self.canvas_out.delete("all")
@@ -223,7 +355,8 @@ class App(tk.Tk):
                 pass
 
     def _render_input_preview(self):
-        self._draw_input_preview(self.loaded_image)
+        # per l'anteprima basta la copia di lavoro ridotta
+        self._draw_input_preview(self._working_image())
 
     def _draw_input_preview(self, image: Image.Image | None):
         canvas = getattr(self, "canvas_in", None)
@@ -245,7 +378,7 @@ class App(tk.Tk):
         canvas.create_image(cw // 2, ch // 2, image=self.tk_preview, anchor="center")
 
     def on_run_ocr(self):
-        if not self.loaded_image:
+        if self._working_image() is None:
             messagebox.showwarning("Nessuna immagine", "Apri prima un'immagine.")
             return
 
@@ -255,10 +388,26 @@ class App(tk.Tk):
             return
         self.lang_var.set(lang)
 
+        # Etichetta gia' elaborata: riusa il risultato senza rifare l'OCR
+        if self._try_history_hit(lang):
+            return
+
+        image = self.loaded_image
+        working = self._working_image()
+        lang = self.lang_var.get()
+        history = self._history
+
         def task():
             try:
-                text = ocr_service.run_ocr(self.loaded_image, self.lang_var.get())
-                self.after(0, self._finish_ocr, text)
+                # un originale rimappato da disco e' RGBX: i motori OCR vogliono RGB
+                text = ocr_service.run_ocr(image if image.mode == "RGB" else image.convert("RGB"), lang)
+                entry_id = None
+                if history is not None and text:
+                    try:
+                        entry_id = history.add(history_store.dhash(working), working, text, lang)
+                    except Exception:
+                        pass
+                self.after(0, self._finish_ocr, text, entry_id)
             except Exception as e:
                 self.after(0, self._fail_ocr, e)
 
@@ -267,10 +416,12 @@ class App(tk.Tk):
         self._set_ocr_running(True)
         threading.Thread(target=task, daemon=True).start()
 
-    def _finish_ocr(self, text: str):
+    def _finish_ocr(self, text: str, entry_id: int | None = None):
         self.text_widget.delete("1.0", tk.END)
         self.text_widget.insert("1.0", text)
         self.text_widget.edit_reset()
+        self._history_entry_id = entry_id
+        self._set_history_status("")
         self._set_ocr_running(False)
         messagebox.showinfo("OCR completato", f"Lingua: {self.lang_var.get().upper()}")
         # Aggiorna subito l'anteprima con il testo ottenuto
@@ -280,6 +431,83 @@ class App(tk.Tk):
         self._set_ocr_running(False)
         messagebox.showerror("Errore OCR", str(err))
 
+    def _try_history_hit(self, lang: str) -> bool:
+        working = self._working_image()
+        if self._history is None or not self.use_history_var.get() or working is None:
+            return False
+        try:
+            entry = self._history.find_similar(history_store.dhash(working), lang)
+            # l'hash da solo non distingue due confezioni che differiscono per il seriale
+            if entry is None or not self._history.looks_same(entry.id, working):
+                return False
+            thumb = self._history.thumbnail(entry.id)
+        except Exception:
+            return False
+        if not self._confirm_history_hit(entry, thumb):
+            return False
+        self._preview_enabled = True
+        self.text_widget.delete("1.0", tk.END)
+        self.text_widget.insert("1.0", entry.ocr_text)
+        self.text_widget.edit_reset()
+        # riseleziona il testo usato per il QR la volta precedente
+        if entry.qr_payload:
+            start = self.text_widget.search(entry.qr_payload, "1.0", stopindex=tk.END)
+            if start:
+                self.text_widget.tag_add(tk.SEL, start, f"{start}+{len(entry.qr_payload)}c")
+        self._history_entry_id = entry.id
+        when = time.strftime("%d/%m/%Y %H:%M", time.localtime(entry.created_at))
+        self._set_history_status(f"Già vista il {when} (#{entry.id})")
+        self._schedule_preview_update(delay_ms=0)
+        return True
+
+    def _confirm_history_hit(self, entry: history_store.HistoryEntry, thumb: Image.Image | None) -> bool:
+        dlg = tk.Toplevel(self)
+        dlg.title("Etichetta già vista")
+        dlg.transient(self)
+        dlg.grab_set()
+        dlg.resizable(False, False)
+
+        when = time.strftime("%d/%m/%Y %H:%M", time.localtime(entry.created_at))
+        ttk.Label(
+            dlg, text=f"Un'etichetta simile è stata letta il {when}. Controlla che sia la stessa confezione."
+        ).pack(padx=12, pady=(12, 6), anchor="w")
+        row = ttk.Frame(dlg)
+        row.pack(fill=tk.X, padx=12)
+        photos: list[ImageTk.PhotoImage] = []
+        for title, img in (("Precedente", thumb), ("Attuale", self._working_image())):
+            col = ttk.Frame(row)
+            col.pack(side=tk.LEFT, padx=(0, 12))
+            ttk.Label(col, text=title).pack(anchor="w")
+            if img is not None:
+                img = img.copy()
+                img.thumbnail((240, 240))
+                photos.append(ImageTk.PhotoImage(img))
+                ttk.Label(col, image=photos[-1]).pack()
+        ttk.Label(dlg, text=entry.ocr_text, wraplength=480, justify="left").pack(padx=12, pady=(8, 0), anchor="w")
+
+        result = {"reuse": False}
+
+        def reuse():
+            result["reuse"] = True
+            dlg.destroy()
+
+        btns = ttk.Frame(dlg)
+        btns.pack(fill=tk.X, padx=12, pady=12)
+        ttk.Button(btns, text="Rifai OCR", command=dlg.destroy).pack(side=tk.RIGHT, padx=(6, 0))
+        ttk.Button(btns, text="Usa risultato precedente", command=reuse).pack(side=tk.RIGHT)
+
+        dlg.update_idletasks()
+        x = self.winfo_rootx() + (self.winfo_width() - dlg.winfo_width()) // 2
+        y = self.winfo_rooty() + (self.winfo_height() - dlg.winfo_height()) // 3
+        dlg.geometry(f"+{x}+{y}")
+
+        self.wait_window(dlg)
+        return result["reuse"]
+
+    def _set_history_status(self, text: str):
+        if self.history_status:
+            self.history_status.config(text=text)
+
     def _set_ocr_running(self, running: bool):
         if self.btn_ocr is None or self.ocr_progress is None:
             return
@@ -376,6 +604,7 @@ class App(tk.Tk):
             return
         img = codegen.generate_qrcode(text, w, h)
         self.generated_image = img
+        self._last_qr_text = text
         self._render_output_preview()
 
     # ---- dialog lingua ----
@@ -455,8 +684,102 @@ class App(tk.Tk):
         )
         if not path:
             return
-        self.generated_image.save(path)
-        messagebox.showinfo("Salvato", path)
+        # Il payload va nello storico solo se il salvataggio riesce (vedi _poll_exports)
+        tag = None
+        if self._history_entry_id is not None and self._last_qr_text:
+            tag = (self._history_entry_id, self._last_qr_text)
+        # La scrittura avviene in background: generated_image viene sostituita, mai modificata
+        try:
+            self._exporter.submit(self.generated_image, path, tag)
+        except Exception as e:
+            messagebox.showerror("Errore salvataggio", str(e))
+            return
+        self._set_export_status(f"Salvataggio in corso ({self._exporter.pending()} in coda)...")
+        self._schedule_export_poll()
+
+    def _set_export_status(self, text: str):
+        if self.export_status:
+            self.export_status.config(text=text)
+
+    def _schedule_export_poll(self):
+        if self._export_poll_job is None:
+            self._export_poll_job = self.after(100, self._poll_exports)
+
+    def _poll_exports(self):
+        self._export_poll_job = None
+        for res in self._exporter.poll_results():
+            if res.error is not None:
+                messagebox.showerror("Errore salvataggio", f"{res.path}\n{res.error}")
+            else:
+                self._record_exported_payload(res.tag)
+                messagebox.showinfo("Salvato", str(res.path))
+        pending = self._exporter.pending()
+        if pending:
+            self._set_export_status(f"Salvataggio in corso ({pending} in coda)...")
+            self._schedule_export_poll()
+        else:
+            self._set_export_status("")
+
+    def _record_exported_payload(self, tag):
+        if self._history is None or tag is None:
+            return
+        entry_id, payload = tag
+        try:
+            self._history.set_qr_payload(entry_id, payload)
+        except Exception:
+            pass
+
+    # -------- Storico --------
+    def _open_history(self):
+        future = self._history_future
+
+        def task():
+            try:
+                future.set_result(history_store.HistoryStore())
+            except Exception:
+                future.set_result(None)
+
+        threading.Thread(target=task, daemon=True).start()
+        self.after(50, self._poll_history_open)
+
+    def _poll_history_open(self):
+        if not self._history_future.done():
+            self.after(50, self._poll_history_open)
+            return
+        self._history = self._history_future.result()
+        if self._history is not None:
+            self.use_history_var.set(True)
+            if self.history_check:
+                self.history_check.config(state=tk.NORMAL)
+
+    # -------- Acquisizioni recenti --------
+    def _refresh_recent_strip(self):
+        if not self.recent_frame:
+            return
+        for child in self.recent_frame.winfo_children():
+            child.destroy()
+        self._recent_photos = []
+        for entry in self._image_store.recent(RECENT_CAPTURES_SHOWN):
+            photo = ImageTk.PhotoImage(entry.thumbnail)
+            self._recent_photos.append(photo)
+            marker = "● " if entry.id == self._current_image_id else ""
+            when = time.strftime("%H:%M:%S", time.localtime(entry.created_at))
+            ttk.Button(
+                self.recent_frame,
+                image=photo,
+                text=f"{marker}{when}",
+                compound="top",
+                command=lambda image_id=entry.id: self._select_recent_image(image_id),
+            ).pack(side=tk.LEFT, padx=(0, 4))
+
+    def _select_recent_image(self, image_id: int):
+        if image_id not in self._image_store:
+            self._refresh_recent_strip()
+            return
+        self._stop_camera_stream()
+        self._current_image_id = image_id
+        self._refresh_recent_strip()
+        self._after_new_input_image()
 
     # dopo apertura immagine, passa automaticamente alla pagina 2
     def _goto_step2(self):
@@ -472,7 +795,8 @@ class App(tk.Tk):
             self.camera_status.config(text=text)
 
     def _set_camera_idle(self, available: bool):
-        state_preview = tk.NORMAL if available else tk.DISABLED
+        # la camera resta occupata finche' il thread di scatto non ha finito
+        state_preview = tk.NORMAL if available and self._camera_grab is None else tk.DISABLED
         if self.btn_camera_preview:
             self.btn_camera_preview.config(state=state_preview)
         if self.btn_camera_capture:
@@ -480,6 +804,23 @@ class App(tk.Tk):
         if self.btn_camera_stop:
             self.btn_camera_stop.config(state=tk.DISABLED)
 
+    def _lock_camera_controls(self, locked: bool):
+        """
+        Durante lo scatto la camera e' usata dal thread di acquisizione: cambiare
+        camera o profilo, rilevare le camere o avviare le postazioni la
+        riaprirebbe mentre e' ancora occupata.
+        """
+        combo_state = "disabled" if locked else "readonly"
+        btn_state = tk.DISABLED if locked else tk.NORMAL
+        if self.profile_combo:
+            self.profile_combo.config(state=combo_state)
+        if self.camera_combo and self._camera_sources:
+            self.camera_combo.config(state=combo_state)
+        if self.btn_camera_refresh:
+            self.btn_camera_refresh.config(state=btn_state)
+        if self.btn_stations_start and not self._station_manager.stations:
+            self.btn_stations_start.config(state=btn_state)
+
     def _set_camera_running(self):
         if self.btn_camera_preview:
             self.btn_camera_preview.config(state=tk.DISABLED)
@@ -508,6 +849,7 @@ class App(tk.Tk):
 
     def _refresh_cameras(self):
         self._stop_camera_stream()
+        self._stop_stations()
         if not self.camera_combo:
             return
         if cv2 is None:
@@ -545,6 +887,18 @@ class App(tk.Tk):
         if self._camera_capture:
             self._stop_camera_stream()
 
+    def _on_profile_selected(self, event=None):
+        if not self.profile_combo:
+            return
+        idx = self.profile_combo.current()
+        if 0 <= idx < len(self._camera_profiles):
+            self._camera_profile = self._camera_profiles[idx]
+        # riapre lo stream con il nuovo profilo
+        if self._camera_capture:
+            index = self._get_selected_camera_index()
+            if index is not None:
+                self._start_camera_stream(index)
+
     def _get_selected_camera_index(self) -> int | None:
         idx = self._selected_camera.get()
         return idx if idx >= 0 else None
@@ -557,6 +911,7 @@ class App(tk.Tk):
         if idx is None:
             messagebox.showwarning("Webcam", "Seleziona una camera prima di avviare l'anteprima.")
             return
+        self._stop_stations()
         self._start_camera_stream(idx)
 
     def _start_camera_stream(self, index: int):
@@ -574,24 +929,40 @@ class App(tk.Tk):
                 cap.release()
             messagebox.showerror("Webcam", f"Impossibile aprire la camera {index}.")
             return
+        profile = self._camera_profile
+        self._camera_mode = camera_profile.negotiate(cap, profile.fourcc, profile.preview_size)
         self._camera_capture = cap
+        self._camera_timer = camera_profile.FrameTimer()
+        self._camera_status_at = 0.0
         self._set_camera_running()
-        self._set_camera_status(f"Anteprima attiva su camera {index}")
+        self._set_camera_status(f"Anteprima attiva su camera {index}: {self._camera_mode}")
         self._schedule_camera_frame()
 
     def _schedule_camera_frame(self):
         if cv2 is None or not self._camera_capture:
             return
-        ok, frame = self._camera_capture.read()
-        if not ok:
+        image, read_s = camera_profile.read_frame(self._camera_capture)
+        if image is None:
             self._stop_camera_stream("Errore lettura webcam")
             messagebox.showwarning("Webcam", "Impossibile leggere frame dalla webcam.")
             return
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        self._live_camera_image = Image.fromarray(frame)
+        self._live_camera_image = image
         self._draw_input_preview(self._live_camera_image)
+        if self._camera_timer:
+            self._camera_timer.update(read_s)
+            now = time.perf_counter()
+            if now - self._camera_status_at >= CAMERA_STATUS_INTERVAL_S:
+                self._camera_status_at = now
+                self._set_camera_status(
+                    f"Anteprima {self._camera_mode} | lettura {self._camera_timer.read_ms:.0f} ms, "
+                    f"{self._camera_timer.fps:.1f} fps | scatto {self._describe_size(self._camera_profile.capture_size)}"
+                )
         self._camera_preview_job = self.after(40, self._schedule_camera_frame)
 
+    @staticmethod
+    def _describe_size(size: tuple[int, int]) -> str:
+        return f"{size[0]}x{size[1]}"
+
     def _stop_camera_stream(self, status: str | None = None):
         was_running = self._camera_capture is not None or self._camera_preview_job is not None
         if self._camera_preview_job:
@@ -600,13 +971,23 @@ class App(tk.Tk):
             except Exception:
                 pass
             self._camera_preview_job = None
+        # uno scatto in corso viene scartato; _poll_camera_still sblocca i controlli
+        still_future, self._still_future = self._still_future, None
+        self._still_fallback = None
         if self._camera_capture:
-            try:
-                self._camera_capture.release()
-            except Exception:
-                pass
+            cap = self._camera_capture
+            if still_future is not None and not still_future.done():
+                # la camera e' ancora in uso dal thread di scatto: la rilascia lui
+                still_future.add_done_callback(lambda f: cap.release())
+            else:
+                try:
+                    cap.release()
+                except Exception:
+                    pass
             self._camera_capture = None
         self._live_camera_image = None
+        self._camera_mode = None
+        self._camera_timer = None
         available = bool(self._camera_sources) and cv2 is not None
         self._set_camera_idle(available)
         if status:
@@ -619,12 +1000,165 @@ class App(tk.Tk):
         if self._live_camera_image is None:
             messagebox.showwarning("Webcam", "Avvia la webcam e attendi che compaia l'anteprima.")
             return
-        self.loaded_image = self._live_camera_image.copy()
-        self._stop_camera_stream("Immagine catturata dalla webcam")
+        # ferma il ciclo di anteprima e passa alla risoluzione di scatto
+        if self._camera_preview_job:
+            try:
+                self.after_cancel(self._camera_preview_job)
+            except Exception:
+                pass
+            self._camera_preview_job = None
+        if self._still_future is not None or not self._camera_capture:
+            return
+        self._set_camera_status("Acquisizione ad alta risoluzione...")
+        for btn in (self.btn_camera_capture, self.btn_camera_stop):
+            if btn:
+                btn.config(state=tk.DISABLED)
+        # cambio di risoluzione e lettura possono richiedere secondi: fuori dal thread Tk
+        cap = self._camera_capture
+        profile = self._camera_profile
+        future: Future = Future()
+
+        def task():
+            start = time.perf_counter()
+            try:
+                still, mode = camera_profile.grab_still(cap, profile)
+            except Exception:
+                still, mode = None, None
+            future.set_result((still, mode, time.perf_counter() - start))
+
+        self._still_future = future
+        self._camera_grab = future
+        self._still_fallback = self._live_camera_image
+        self._lock_camera_controls(True)
+        threading.Thread(target=task, daemon=True).start()
+        self.after(30, self._poll_camera_still)
+
+    def _poll_camera_still(self):
+        grab = self._camera_grab
+        if grab is None:
+            return
+        if not grab.done():
+            self.after(30, self._poll_camera_still)
+            return
+        # il thread ha finito: la camera e' di nuovo libera
+        self._camera_grab = None
+        self._lock_camera_controls(False)
+        if self._still_future is not grab:
+            # anteprima fermata durante lo scatto: il risultato si scarta
+            if self._camera_capture is None:
+                self._set_camera_idle(bool(self._camera_sources) and cv2 is not None)
+            return
+        still, mode, elapsed_s = grab.result()
+        fallback = self._still_fallback
+        source = f"Camera {self._get_selected_camera_index()}"
+        if still is not None:
+            self._set_input_image(still, source)
+            status = f"Immagine catturata: {mode} in {elapsed_s * 1000:.0f} ms"
+        else:
+            # il driver non ha fornito lo scatto: si usa l'ultimo fotogramma di anteprima
+            self._set_input_image(fallback, source)
+            status = f"Immagine catturata dall'anteprima ({self._describe_size(fallback.size)})"
+        self._stop_camera_stream(status)
         self._after_new_input_image()
 
+    def _flush_exports(self):
+        if self._export_poll_job:
+            try:
+                self.after_cancel(self._export_poll_job)
+            except Exception:
+                pass
+            self._export_poll_job = None
+        pending = self._exporter.pending()
+        if pending:
+            self._set_export_status(f"Completamento salvataggi ({pending})...")
+            self.update_idletasks()
+        done = self._exporter.close(timeout=EXPORT_CLOSE_TIMEOUT_S)
+        failed = [res for res in self._exporter.poll_results() if res.error is not None]
+        if failed or not done:
+            lines = [f"{res.path}: {res.error}" for res in failed]
+            if not done:
+                lines.append(f"{self._exporter.pending()} salvataggi non completati.")
+            messagebox.showerror("Errore salvataggio", "\n".join(lines))
+
+    # -------- Multi-postazione --------
+    def on_start_stations(self):
+        if cv2 is None:
+            messagebox.showerror("Postazioni", "Installa il pacchetto opencv-python per usare le webcam.")
+            return
+        if not self._camera_sources:
+            messagebox.showwarning("Postazioni", "Nessuna camera rilevata.")
+            return
+        # ogni camera puo' essere aperta da un solo stream alla volta
+        self._stop_camera_stream()
+        self._stop_stations()
+        self._station_manager.start(self._camera_sources, self._camera_profile)
+        for i, station in enumerate(self._station_manager.stations):
+            tile = StationTile(
+                self.stations_frame,
+                f"Postazione {i + 1} (camera {station.camera_index})",
+                on_capture=lambda sid=station.station_id: self.on_capture_station(sid),
+            )
+            tile.grid(row=i // STATION_COLUMNS, column=i % STATION_COLUMNS, padx=4, pady=4, sticky="n")
+            self._station_tiles[station.station_id] = tile
+        if self.btn_stations_start:
+            self.btn_stations_start.config(state=tk.DISABLED)
+        if self.btn_stations_stop:
+            self.btn_stations_stop.config(state=tk.NORMAL)
+        self._station_poll_job = self.after(50, self._poll_stations)
+
+    def _stop_stations(self):
+        if self._station_poll_job:
+            try:
+                self.after_cancel(self._station_poll_job)
+            except Exception:
+                pass
+            self._station_poll_job = None
+        self._station_manager.stop()
+        for tile in self._station_tiles.values():
+            tile.destroy()
+        self._station_tiles = {}
+        if self.btn_stations_start:
+            self.btn_stations_start.config(state=tk.NORMAL)
+        if self.btn_stations_stop:
+            self.btn_stations_stop.config(state=tk.DISABLED)
+
+    def on_capture_station(self, station_id: int):
+        station = next((st for st in self._station_manager.stations if st.station_id == station_id), None)
+        tile = self._station_tiles.get(station_id)
+        if station is None or tile is None:
+            return
+        if not station.request_capture(self._normalize_lang(self.lang_var.get())):
+            tile.result.config(text="Postazione occupata o camera non pronta", foreground="#b35900")
+
+    def _poll_stations(self):
+        self._station_poll_job = None
+        for result in self._station_manager.poll_results():
+            tile = self._station_tiles.get(result.station_id)
+            if tile:
+                tile.show_result(result)
+        total_per_min = 0.0
+        for station in self._station_manager.stations:
+            tile = self._station_tiles.get(station.station_id)
+            if not tile:
+                continue
+            stats = station.stats()
+            total_per_min += stats.ocr_per_min
+            tile.show_preview(station.latest_preview())
+            tile.show_stats(stats, str(station.mode) if station.mode else "-")
+        if self.stations_summary:
+            self.stations_summary.config(
+                text=f"Postazioni attive: {len(self._station_tiles)} | OCR totali ultimo minuto: {total_per_min:.0f}"
+            )
+        self._station_poll_job = self.after(50, self._poll_stations)
+
     def _on_close(self):
         self._stop_camera_stream()
+        self._stop_stations()
+        self._station_manager.shutdown()
+        self._flush_exports()
+        # se lo storico si sta ancora aprendo viene chiuso appena pronto
+        self._history_future.add_done_callback(lambda f: f.result() is not None and f.result().close())
+        self._image_store.close()
         try:
             self.destroy()
         except Exception:
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable
+
+from PIL import Image, ImageTk
+
+from ..config import STATION_QR_SIZE, STATION_TILE_SIZE
+from ..stations import StationResult, StationStats
+
+
+class StationTile(ttk.Labelframe):
+    """Riquadro di una postazione: anteprima, throughput, ultimo testo e QR."""
+
+    def __init__(self, master, title: str, on_capture: Callable[[], None]):
+        super().__init__(master, text=title, padding=(6, 4))
+        self.tk_preview: ImageTk.PhotoImage | None = None
+        self.tk_qr: ImageTk.PhotoImage | None = None
+        self._last_preview: Image.Image | None = None
+
+        self.canvas = tk.Canvas(
+            self,
+            width=STATION_TILE_SIZE[0],
+            height=STATION_TILE_SIZE[1],
+            background="#f3f3f3",
+            highlightthickness=1,
+        )
+        self.canvas.grid(row=0, column=0, columnspan=2, sticky="nsew")
+        self.status = ttk.Label(self, text="Avvio...", foreground="#555")
+        self.status.grid(row=1, column=0, columnspan=2, sticky="w", pady=(4, 0))
+        self.btn_capture = ttk.Button(self, text="Scatta e OCR", command=on_capture)
+        self.btn_capture.grid(row=2, column=0, sticky="w", pady=(4, 0))
+        self.qr_canvas = tk.Canvas(
+            self,
+            width=STATION_QR_SIZE[0] // 2,
+            height=STATION_QR_SIZE[1] // 2,
+            background="#f9f9f9",
+            highlightthickness=1,
+        )
+        self.qr_canvas.grid(row=2, column=1, rowspan=2, sticky="e", pady=(4, 0))
+        self.result = ttk.Label(self, text="", wraplength=STATION_TILE_SIZE[0] - STATION_QR_SIZE[0] // 2)
+        self.result.grid(row=3, column=0, sticky="nw")
+
+    def show_preview(self, image: Image.Image | None):
+        # il thread di acquisizione crea una nuova miniatura per ogni fotogramma:
+        # se e' la stessa di prima non serve ricreare la PhotoImage
+        if image is None or image is self._last_preview:
+            return
+        self._last_preview = image
+        self.tk_preview = ImageTk.PhotoImage(image)
+        self.canvas.delete("all")
+        self.canvas.create_image(
+            STATION_TILE_SIZE[0] // 2, STATION_TILE_SIZE[1] // 2, image=self.tk_preview, anchor="center"
+        )
+
+    def show_stats(self, stats: StationStats, mode: str):
+        if stats.error and stats.frame_age_s is None:
+            text = stats.error
+        elif stats.stalled:
+            text = f"Camera bloccata da {stats.frame_age_s:.0f} s"
+        else:
+            text = f"{mode} | {stats.fps:.1f} fps, lettura {stats.read_ms:.0f} ms"
+        text += f"\nOCR: {stats.ocr_done} totali, {stats.ocr_per_min:.0f}/min, media {stats.ocr_avg_ms:.0f} ms"
+        self.status.config(text=text)
+        self.btn_capture.config(state=tk.DISABLED if stats.busy else tk.NORMAL)
+
+    def show_result(self, result: StationResult):
+        self.qr_canvas.delete("all")
+        self.tk_qr = None
+        if result.error is not None:
+            self.result.config(text=f"Errore: {result.error}", foreground="#b00020")
+            return
+        self.result.config(text=result.text or "(nessun testo)", foreground="")
+        if result.qr is not None:
+            qr = result.qr.copy()
+            qr.thumbnail((STATION_QR_SIZE[0] // 2, STATION_QR_SIZE[1] // 2))
+            self.tk_qr = ImageTk.PhotoImage(qr)
+            self.qr_canvas.create_image(
+                STATION_QR_SIZE[0] // 4, STATION_QR_SIZE[1] // 4, image=self.tk_qr, anchor="center"
+            )
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Permette `pytest` dalla radice del repository senza installare il pacchetto
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
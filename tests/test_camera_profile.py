@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src import camera_profile
+
+
+def _fourcc(*chars: str) -> int:
+    return sum(ord(c) << (8 * i) for i, c in enumerate(chars))
+
+
+# solo le parti di cv2 usate da camera_profile: i test girano anche senza OpenCV
+_CV2 = SimpleNamespace(
+    CAP_PROP_FRAME_WIDTH=3,
+    CAP_PROP_FRAME_HEIGHT=4,
+    CAP_PROP_FPS=5,
+    CAP_PROP_FOURCC=6,
+    COLOR_BGR2RGB=4,
+    VideoWriter_fourcc=_fourcc,
+    cvtColor=lambda frame, code: frame[:, :, ::-1],
+)
+
+
+@pytest.fixture(autouse=True)
+def fake_cv2(monkeypatch):
+    monkeypatch.setattr(camera_profile, "cv2", _CV2)
+
+
+class FakeCap:
+    """
+    Driver finto: accetta solo i formati in `formats`, e dopo un cambio di
+    risoluzione consegna `stale_frames` fotogrammi della dimensione precedente.
+    """
+
+    def __init__(self, formats=("MJPG",), stale_frames=0, frame_size=None):
+        self.formats = set(formats)
+        self.stale_frames = stale_frames
+        self.frame_size = frame_size  # se impostata, i fotogrammi hanno sempre questa dimensione
+        self.props = {_CV2.CAP_PROP_FRAME_WIDTH: 640, _CV2.CAP_PROP_FRAME_HEIGHT: 480,
+                      _CV2.CAP_PROP_FOURCC: _fourcc(*"YUYV"), _CV2.CAP_PROP_FPS: 30.0}
+        self.calls: list[tuple[int, float]] = []
+        self._delivered = (640, 480)
+        self._stale = 0
+
+    def set(self, prop, value):
+        self.calls.append((prop, value))
+        if prop == _CV2.CAP_PROP_FOURCC:
+            code = "".join(chr((int(value) >> (8 * i)) & 0xFF) for i in range(4))
+            if code not in self.formats:
+                return False
+        elif self.props.get(prop) != value:
+            self._stale = self.stale_frames
+        self.props[prop] = value
+        return True
+
+    def get(self, prop):
+        return self.props.get(prop, 0.0)
+
+    def grab(self):
+        self._advance()
+        return True
+
+    def read(self):
+        self._advance()
+        w, h = self.frame_size or self._delivered
+        frame = np.zeros((h, w, 3), dtype=np.uint8)
+        frame[:, :, 0] = 255  # blu in BGR
+        return True, frame
+
+    def _advance(self):
+        if self._stale:
+            self._stale -= 1
+        else:
+            self._delivered = (int(self.props[_CV2.CAP_PROP_FRAME_WIDTH]), int(self.props[_CV2.CAP_PROP_FRAME_HEIGHT]))
+
+
+PROFILE = camera_profile.CameraProfile("test", ("MJPG", "YUYV"), (640, 480), (1920, 1080))
+
+
+def test_decode_fourcc():
+    assert camera_profile._decode_fourcc(float(_fourcc(*"MJPG"))) == "MJPG"
+    assert camera_profile._decode_fourcc(0.0) == ""
+    assert camera_profile._decode_fourcc(float(_fourcc("\x01", "\x02", "a", "b"))) == ""
+
+
+def test_negotiate_sets_fourcc_before_size_and_falls_back():
+    cap = FakeCap(formats=("YUYV",))
+    mode = camera_profile.negotiate(cap, ("MJPG", "YUYV"), (1280, 720))
+    assert mode == camera_profile.CameraMode(1280, 720, "YUYV", 30.0)
+    props = [prop for prop, _ in cap.calls]
+    # un tentativo per formato, ciascuno con FOURCC prima delle dimensioni
+    assert props == [_CV2.CAP_PROP_FOURCC, _CV2.CAP_PROP_FRAME_WIDTH, _CV2.CAP_PROP_FRAME_HEIGHT] * 2
+    assert cap.calls[0][1] == _fourcc(*"MJPG")
+    assert cap.calls[3][1] == _fourcc(*"YUYV")
+
+
+def test_negotiate_reports_driver_mode_when_no_format_is_accepted():
+    cap = FakeCap(formats=())
+    mode = camera_profile.negotiate(cap, ("MJPG",), (1280, 720))
+    assert (mode.width, mode.height, mode.fourcc) == (1280, 720, "YUYV")
+
+
+def test_grab_still_skips_stale_frames_and_restores_preview():
+    cap = FakeCap(stale_frames=camera_profile.CAMERA_STILL_WARMUP_FRAMES + 1)
+    image, mode = camera_profile.grab_still(cap, PROFILE, restore_preview=True)
+    assert (mode.width, mode.height) == (1920, 1080)
+    assert image is not None and image.size == (1920, 1080)
+    assert image.getpixel((0, 0)) == (0, 0, 255)  # BGR convertito in RGB
+    assert (cap.props[_CV2.CAP_PROP_FRAME_WIDTH], cap.props[_CV2.CAP_PROP_FRAME_HEIGHT]) == (640, 480)
+
+
+def test_grab_still_returns_none_when_size_never_matches():
+    cap = FakeCap(frame_size=(640, 480))  # il driver dichiara 1920x1080 ma consegna l'anteprima
+    image, mode = camera_profile.grab_still(cap, PROFILE)
+    assert image is None
+    assert (mode.width, mode.height) == (1920, 1080)
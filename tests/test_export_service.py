@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import os
+import stat
+
+import pytest
+from PIL import Image
+
+qrcode = pytest.importorskip("qrcode")
+
+from src import codegen, export_service
+
+
+@pytest.mark.parametrize("size", [(64, 64), (333, 333), (1920, 1080)])
+def test_resized_qr_is_saved_as_one_bit_png(size):
+    qr = codegen.generate_qrcode("ABC-12345/XYZ", *size)
+    assert export_service.reduce_for_export(qr, "PNG").mode == "1"
+    jpeg = export_service.reduce_for_export(qr, "JPEG")
+    assert jpeg.mode == "L"
+    assert not any(jpeg.histogram()[1:255])
+
+
+def test_photo_like_gray_image_is_not_thresholded():
+    ramp = Image.linear_gradient("L").convert("RGB")
+    assert export_service.reduce_for_export(ramp, "PNG").mode == "L"
+
+
+def test_save_atomic_uses_umask_permissions(tmp_path):
+    target = tmp_path / "qr.png"
+    export_service.save_atomic(codegen.generate_qrcode("X1", 200, 200), target)
+    assert stat.S_IMODE(os.stat(target).st_mode) == export_service._FILE_MODE
+    assert [p.name for p in tmp_path.iterdir()] == ["qr.png"]
+    with Image.open(target) as img:
+        assert img.mode == "1"
+
+
+def test_writer_returns_tag_with_result(tmp_path):
+    writer = export_service.ExportWriter()
+    try:
+        writer.submit(codegen.generate_qrcode("X1", 64, 64), tmp_path / "ok.png", tag=(7, "X1"))
+        writer.submit(codegen.generate_qrcode("X2", 64, 64), tmp_path / "missing" / "ko.png", tag=(8, "X2"))
+        assert writer.flush(10)
+        results = writer.poll_results()
+    finally:
+        writer.close(10)
+    assert [(r.tag, r.error is None) for r in results] == [((7, "X1"), True), ((8, "X2"), False)]
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import random
+import time
+
+import pytest
+from PIL import Image, ImageDraw
+
+pytest.importorskip("numpy")
+
+from src import history_store
+from src.history_store import HASH_BITS, HistoryStore
+
+
+def _brute_force(entries, query, lang, max_distance):
+    best = None
+    for entry_id, phash, entry_lang in entries:
+        if entry_lang != lang:
+            continue
+        dist = (phash ^ query).bit_count()
+        if dist <= max_distance and (best is None or (dist, -entry_id) < (best[0], -best[1])):
+            best = (dist, entry_id)
+    return best
+
+
+def _flip(value: int, rnd: random.Random, bits: int) -> int:
+    for b in rnd.sample(range(HASH_BITS), bits):
+        value ^= 1 << b
+    return value
+
+
+def test_index_matches_brute_force_on_clustered_hashes():
+    # etichette simili: un hash base con pochi bit cambiati, due lingue
+    rnd = random.Random(7)
+    store = HistoryStore(":memory:", max_distance=12, index_limit=5000)
+    image = Image.new("RGB", (8, 8))
+    base = rnd.getrandbits(HASH_BITS)
+    entries = []
+    for _ in range(6000):
+        phash = _flip(base, rnd, rnd.randint(0, 20))
+        lang = rnd.choice(["ita", "eng"])
+        entries.append((store.add(phash, image, "x", lang), phash, lang))
+    recent = entries[-5000:]  # l'indice tiene solo le ultime index_limit voci
+
+    for _ in range(300):
+        query = _flip(base, rnd, rnd.randint(0, 24))
+        lang = rnd.choice(["ita", "eng", "deu"])
+        entry = store.find_similar(query, lang)
+        expected = _brute_force(recent, query, lang, 12)
+        got = None if entry is None else (entry.distance, entry.id)
+        assert got == expected
+
+
+def test_lookup_under_a_millisecond_at_default_index_size():
+    rnd = random.Random(3)
+    store = HistoryStore(":memory:")  # HISTORY_INDEX_LIMIT di default
+    base = rnd.getrandbits(HASH_BITS)
+    rows = [
+        (i + 1, history_store._hash_to_blob(_flip(base, rnd, rnd.randint(0, 10))), "ita")
+        for i in range(store.index_limit)
+    ]
+    store._index_rows(rows)
+    assert len(store) == store.index_limit >= 100_000
+    timings = []
+    for _ in range(50):
+        q = _flip(base, rnd, rnd.randint(0, 10))
+        start = time.perf_counter()
+        store.find_similar(q, "ita")
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    assert timings[len(timings) // 2] < 0.001
+
+
+def test_reopened_store_loads_the_same_index(tmp_path):
+    rnd = random.Random(11)
+    path = tmp_path / "history.sqlite3"
+    store = HistoryStore(path, index_limit=50)
+    image = Image.new("RGB", (8, 8))
+    entries = []
+    for _ in range(80):
+        phash, lang = rnd.getrandbits(HASH_BITS), rnd.choice(["ita", "eng", None])
+        entries.append((store.add(phash, image, "x", lang), phash, lang))
+    store.close()
+
+    reopened = HistoryStore(path, index_limit=50)
+    assert len(reopened) == 50
+    for entry_id, phash, lang in entries:
+        entry = reopened.find_similar(phash, lang)
+        if entry_id > entries[-51][0]:
+            assert (entry.id, entry.distance, entry.lang) == (entry_id, 0, lang)
+        else:
+            # fuori dall'indice: resta solo nel database
+            assert entry is None
+    reopened.close()
+
+
+def _label(serial: str) -> Image.Image:
+    img = Image.new("RGB", (640, 480), "white")
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((100, 100, 540, 380), outline="black", width=6)
+    draw.text((140, 160), "PRODOTTO 123", fill="black")
+    draw.text((140, 260), serial, fill="black")
+    return img
+
+
+def test_looks_same_rejects_a_different_image():
+    store = HistoryStore(":memory:")
+    label = _label("SN 000111")
+    entry_id = store.add(history_store.dhash(label), label, "SN 000111", "ita")
+    assert store.looks_same(entry_id, label)
+    assert not store.looks_same(entry_id, Image.new("RGB", (640, 480), "black"))
+
+
+def test_lookup_requires_same_language():
+    store = HistoryStore(":memory:")
+    label = _label("SN 000111")
+    phash = history_store.dhash(label)
+    store.add(phash, label, "SN 000111", "ita")
+    assert store.find_similar(phash, "ita") is not None
+    assert store.find_similar(phash, "eng") is None
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import threading
+
+from PIL import Image
+
+from src import image_store
+
+
+def _photo(size: tuple[int, int]) -> Image.Image:
+    return Image.effect_noise(size, 60).convert("RGB")
+
+
+def test_spilled_original_is_mapped_not_copied():
+    store = image_store.SessionImageStore(ram_budget_mb=1, working_size=64)
+    try:
+        first = _photo((640, 480))
+        first_id = store.add(first, "test")
+        store.add(_photo((640, 480)), "test")  # fa uscire il primo dal budget
+        assert store.flush_spills(10)
+        assert store.get(first_id).spill_path is not None
+
+        full = store.get_full(first_id)
+        assert full.mode == "RGBX"
+        assert full.readonly  # i pixel puntano al file mappato
+        assert full.size == first.size
+        assert full.convert("RGB").tobytes() == first.tobytes()
+    finally:
+        store.close()
+
+
+def test_budget_counts_working_copies_and_real_pixel_size():
+    store = image_store.SessionImageStore(ram_budget_mb=64, working_size=128)
+    try:
+        large_id = store.add(_photo((400, 300)), "test")
+        entry = store.get(large_id)
+        pixels = 400 * 300 + entry.working.width * entry.working.height
+        expected = (pixels + entry.thumbnail.width * entry.thumbnail.height) * 4
+        assert store.ram_used == expected
+
+        # gia' piccola quanto la copia di lavoro: nessun duplicato
+        small = _photo((100, 80))
+        small_id = store.add(small, "test")
+        assert store.get(small_id).working is small
+        assert store.get_full(small_id) is small
+        small_entry = store.get(small_id)
+        expected += (100 * 80 + small_entry.thumbnail.width * small_entry.thumbnail.height) * 4
+        assert store.ram_used == expected
+
+        store.close()
+        assert store.ram_used == 0
+    finally:
+        store.close()
+
+
+def test_dropped_entries_release_their_budget():
+    store = image_store.SessionImageStore(ram_budget_mb=64, working_size=128, max_entries=2)
+    try:
+        for _ in range(5):
+            store.add(_photo((200, 150)), "test")
+        per_entry = store.ram_used // 2
+        assert len(store.recent(10)) == 2
+        store.add(_photo((200, 150)), "test")
+        assert store.ram_used == 2 * per_entry
+    finally:
+        store.close()
+
+
+def test_spill_is_written_off_the_calling_thread(monkeypatch):
+    release = threading.Event()
+    writer_threads = []
+    write_spill = image_store.SessionImageStore._write_spill
+
+    def slow_write(self, image_id, original, path):
+        writer_threads.append(threading.current_thread())
+        release.wait(10)
+        write_spill(self, image_id, original, path)
+
+    monkeypatch.setattr(image_store.SessionImageStore, "_write_spill", slow_write)
+    store = image_store.SessionImageStore(ram_budget_mb=1, working_size=64)
+    try:
+        first = _photo((640, 480))
+        first_id = store.add(first, "test")
+        store.add(_photo((640, 480)), "test")  # ritorna subito: la scrittura e' bloccata
+        used_before = store.ram_used
+        # finche' il file non e' completo l'originale resta in RAM e nel budget
+        assert store.get(first_id).spill_path is None
+        assert store.get_full(first_id) is first
+
+        release.set()
+        assert store.flush_spills(10)
+        assert writer_threads and writer_threads[0] is not threading.current_thread()
+        assert store.get(first_id).spill_path is not None
+        assert store.ram_used == used_before - 640 * 480 * 4
+    finally:
+        release.set()
+        store.close()
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageDraw
+
+pytest.importorskip("pytesseract")
+pytest.importorskip("numpy")
+
+from src import ocr_engines
+
+
+def test_ctc_decode_collapses_repeats_and_drops_blanks():
+    charset = ["", "a", "b", "c"]
+    assert ocr_engines.ctc_decode([1, 1, 0, 1, 2, 2, 0, 0, 3], charset) == "aabc"
+    assert ocr_engines.ctc_decode([0, 0, 0], charset) == ""
+    # indici fuori dal charset (es. classe spazio non prevista) vengono ignorati
+    assert ocr_engines.ctc_decode([1, 9, 2], charset) == "ab"
+
+
+def test_split_text_lines_finds_each_band():
+    image = Image.new("RGB", (400, 200), "white")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((20, 30, 300, 50), fill="black")
+    draw.rectangle((40, 120, 380, 150), fill="black")
+    lines = ocr_engines.split_text_lines(image)
+    assert [line.size for line in lines] == [(289, 29), (349, 39)]
+
+
+def test_split_text_lines_dark_background_and_blank_image():
+    image = Image.new("L", (200, 100), 0)
+    ImageDraw.Draw(image).rectangle((10, 40, 150, 60), fill=255)
+    assert len(ocr_engines.split_text_lines(image)) == 1
+    blank = Image.new("L", (50, 50), 255)
+    assert ocr_engines.split_text_lines(blank) == [blank]
+
+
+def test_split_pages():
+    assert ocr_engines.split_pages("uno\n\fdue\n\f", 2) == ["uno", "due"]
+    assert ocr_engines.split_pages("uno\fdue", 3) is None
+
+
+def _fake_tesseract(monkeypatch, output: str):
+    calls = {"batch": [], "single": 0}
+
+    def run_tesseract(input_filename, output_filename_base, extension, lang, *args, **kwargs):
+        calls["batch"].append(Path(input_filename).read_text(encoding="utf-8").splitlines())
+        Path(f"{output_filename_base}.{extension}").write_text(output, encoding="utf-8")
+
+    def image_to_string(image, lang=None, **kwargs):
+        calls["single"] += 1
+        return f" singola {calls['single']} "
+
+    monkeypatch.setattr(ocr_engines.pytesseract.pytesseract, "run_tesseract", run_tesseract)
+    monkeypatch.setattr(ocr_engines.pytesseract, "image_to_string", image_to_string)
+    return calls
+
+
+def test_cli_batch_uses_one_process_and_splits_pages(monkeypatch):
+    calls = _fake_tesseract(monkeypatch, "prima\n\fseconda\n\fterza\n\f")
+    images = [Image.new("RGB", (20, 20), "white") for _ in range(3)]
+    texts = ocr_engines.TesseractCliEngine().recognize_batch(images, "ita")
+    assert texts == ["prima", "seconda", "terza"]
+    assert len(calls["batch"]) == 1 and len(calls["batch"][0]) == 3
+    assert calls["single"] == 0
+
+
+def test_cli_batch_falls_back_when_page_count_differs(monkeypatch):
+    calls = _fake_tesseract(monkeypatch, "una sola pagina\f")
+    images = [Image.new("RGB", (20, 20), "white") for _ in range(2)]
+    texts = ocr_engines.TesseractCliEngine().recognize_batch(images, "ita")
+    assert texts == ["singola 1", "singola 2"]
+
+
+def test_engine_missing_a_method_fails_on_creation():
+    class Incomplete(ocr_engines.OcrEngine):
+        def status_text(self) -> str:
+            return ""
+
+    with pytest.raises(TypeError):
+        Incomplete()
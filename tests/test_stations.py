@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import queue
+from concurrent.futures import Future
+
+import pytest
+from PIL import Image
+
+pytest.importorskip("qrcode")
+pytest.importorskip("pytesseract")
+
+from src import camera_profile, ocr_engines, ocr_service, stations
+
+
+class _ManualPool:
+    def __init__(self):
+        self.futures: list[Future] = []
+
+    def submit(self, image, lang):
+        future: Future = Future()
+        self.futures.append(future)
+        return future
+
+
+def _station(pool) -> stations.Station:
+    profile = camera_profile.CameraProfile("test", ("MJPG",), (640, 480), (1920, 1080))
+    station = stations.Station(0, 0, profile, pool, queue.Queue())
+    station._cap = object()  # il thread di acquisizione non viene avviato
+    return station
+
+
+def test_timed_out_station_does_not_take_another_pool_slot(monkeypatch):
+    pool = _ManualPool()
+    station = _station(pool)
+    assert station.request_capture("ita")
+    # il thread di acquisizione consegna lo scatto
+    request, station._still_request = station._still_request, None
+    request.set_result(Image.new("RGB", (32, 32), "white"))
+    assert len(pool.futures) == 1
+
+    monkeypatch.setattr(stations, "STATION_CAPTURE_TIMEOUT_S", -1.0)
+    stats = station.stats()
+    assert stats.busy  # l'OCR occupa ancora un thread del pool
+    assert not station.request_capture("ita")
+    assert len(pool.futures) == 1
+
+    pool.futures[0].set_result("")
+    assert not station.stats().busy
+    assert station.request_capture("ita")
+
+
+def test_unserved_still_request_is_cancelled_on_timeout(monkeypatch):
+    pool = _ManualPool()
+    station = _station(pool)
+    assert station.request_capture("ita")
+    request = station._still_request
+    monkeypatch.setattr(stations, "STATION_CAPTURE_TIMEOUT_S", -1.0)
+    station.stats()
+    assert request.cancelled()
+    assert station._still_request is None
+    assert pool.futures == []
+
+
+def test_restart_drops_results_of_the_previous_run(monkeypatch):
+    monkeypatch.setattr(stations.Station, "start", lambda self: None)  # niente thread di acquisizione
+    monkeypatch.setattr(stations.Station, "join", lambda self, timeout=None: None)
+    manager = stations.StationManager(workers=1)
+    manager.pool.shutdown()
+    manager.pool = pool = _ManualPool()
+    profile = camera_profile.CameraProfile("test", ("MJPG",), (640, 480), (1920, 1080))
+
+    manager.start([0], profile)
+    old = manager.stations[0]
+    old._cap = object()
+    assert old.request_capture("ita")
+    request, old._still_request = old._still_request, None
+    request.set_result(Image.new("RGB", (32, 32), "white"))
+
+    manager.start([0], profile)  # stesso id 0 per la nuova postazione
+    pool.futures[0].set_result("")  # l'OCR della vecchia postazione finisce adesso
+    assert manager.poll_results() == []
+
+
+def test_pool_shares_the_service_engine(monkeypatch):
+    created = []
+
+    class _Engine(ocr_engines.OcrEngine):
+        def __init__(self):
+            created.append(self)
+            self.closed = False
+
+        def recognize_batch(self, images, lang):
+            return [lang for _ in images]
+
+        def status_text(self):
+            return ""
+
+        def close(self):
+            self.closed = True
+
+    monkeypatch.setitem(ocr_engines.ENGINE_CLASSES, "fake", _Engine)
+    monkeypatch.setattr(ocr_service, "_engine_name", "fake")
+    monkeypatch.setattr(ocr_service, "_engines", {})
+    pool = stations.OcrWorkerPool(workers=2)
+    futures = [pool.submit(Image.new("RGB", (8, 8)), "ita") for _ in range(6)]
+    assert [f.result(5) for f in futures] == ["ita"] * 6
+    assert ocr_service.get_engine() is created[0]
+    assert len(created) == 1  # modello caricato una volta sola, anche con piu' worker
+    pool.shutdown()
+    assert created[0].closed